@@ -6,16 +6,23 @@ from logging.handlers import RotatingFileHandler
 from datetime import datetime
 import time
 import json
-import traceback
-import uuid
+import secrets
 import re
 import random
+import threading
+import inspect
+import atexit
+import types
+from pathlib import Path
+from functools import lru_cache
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from cachetools import TTLCache
 
 # Try importing optional dependencies
 try:
-    from flask import Flask, request, jsonify
+    from flask import Flask, request, jsonify, Response
     from flask_cors import CORS
     from flask_limiter import Limiter
     from flask_limiter.util import get_remote_address
@@ -25,6 +32,8 @@ except ImportError as e:
     print("Install with: pip install flask flask-cors flask-limiter flask-caching")
     exit(1)
 
+from common import CARD_NUMBER_SEPARATORS, OrjsonJSONProvider
+
 # Try importing agentql which is used for some flows
 try:
     import agentql
@@ -46,25 +55,59 @@ except ImportError:
     print("Install with: pip install playwright")
     print("Then run: playwright install")
 
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+    print("Warning: flask-compress not installed. Responses will be sent uncompressed.")
+
+try:
+    from playwright_stealth import stealth_async
+except ImportError:
+    stealth_async = None
+    print("Warning: playwright_stealth not installed. The Fido flow will not work.")
+
+
+def patch_playwright_stack_capture():
+    """
+    Playwright records the caller's stack with inspect.stack() on every API call, which
+    reads source lines for each frame and dominates CPU in the RPA flows. Swap the
+    inspect module seen by playwright's connection for one whose stack() skips the
+    source context; frame file/line metadata is unchanged. Set PW_INSPECT_STACK=1 to
+    keep the stock behaviour.
+    """
+    if os.environ.get("PW_INSPECT_STACK", "0") == "1":
+        return
+    try:
+        from playwright._impl import _connection
+    except ImportError:
+        return
+    fast_inspect = types.SimpleNamespace(**vars(inspect))
+    fast_inspect.stack = lambda context=1: inspect.stack(0)[1:]
+    _connection.inspect = fast_inspect
+
+patch_playwright_stack_capture()
+
 
 # -------------------------------------------------------------------------
 #                          CONFIG / SETUP
 # -------------------------------------------------------------------------
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-key-please-change'
+    DEBUG = os.environ.get('FLASK_DEBUG') == '1'  # enables DEBUG-level RPA step logging
     SESSION_TIMEOUT = 30  # minutes
     MAX_RECOMMENDATIONS = 5
     RPA_TIMEOUT = 300  # seconds  # for the flows
+    SCREENSHOT_DIR = Path('logs')  # RPA flow screenshots
+    SCREENSHOT_JPEG_QUALITY = 70  # JPEG encodes far faster than PNG for full-page debug shots
+    BROWSER_STATE_DIR = Path('logs/browser_state')  # per-carrier consent/anti-bot cookies
+    MAX_PARALLEL_PAGES = 3  # concurrent RPA sessions in a batch
 
 
 def ensure_directories():
-    directories = ['logs']
+    directories = ['logs', Config.SCREENSHOT_DIR, Config.BROWSER_STATE_DIR]
     for directory in directories:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            print(f"Created directory: {directory}")
-        else:
-            print(f"Directory already exists: {directory}")
+        Path(directory).mkdir(parents=True, exist_ok=True)
 
 
 ensure_directories()
@@ -83,11 +126,18 @@ def setup_logging():
 app = Flask(__name__)
 app.config.from_object(Config)
 
+app.json = OrjsonJSONProvider(app)
+
 CORS(app)
+if Compress is not None:
+    # br/gzip for the large inline chat, index and checkout pages
+    Compress(app)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", "memory://"),
+    strategy="moving-window"
 )
 cache = Cache(app, config={'CACHE_TYPE': 'simple'})
 
@@ -110,13 +160,13 @@ def add_security_headers(response):
 
 handler = setup_logging()
 app.logger.addHandler(handler)
-app.logger.setLevel(logging.INFO)
+app.logger.setLevel(logging.DEBUG if Config.DEBUG else logging.INFO)
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter(
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 ))
-console_handler.setLevel(logging.INFO)
+console_handler.setLevel(logging.DEBUG if Config.DEBUG else logging.INFO)
 app.logger.addHandler(console_handler)
 
 app.logger.info('Blue startup - Logging initialized')
@@ -164,7 +214,132 @@ conversation_context = {
     "last_message": "",
     "form_submitted": False
 }
-active_rpa_sessions = {}  # If you want to keep the browser open
+
+
+class RPASessionCache(TTLCache):
+    """
+    Open RPA sessions, dropped after Config.RPA_TIMEOUT seconds or once maxsize is hit.
+    An evicted session's browser context is closed; the browser itself is shared.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Flows on different request threads store/pop sessions; TTLCache itself isn't thread-safe
+        self.lock = threading.RLock()
+        self._evicted = []
+        self._depth = 0
+
+    def _mutate(self, method, *args):
+        # Evictions are only collected under the lock; contexts close once the outermost mutation is done
+        with self.lock:
+            self._depth += 1
+            try:
+                result = method(*args)
+            finally:
+                self._depth -= 1
+            evicted = []
+            if not self._depth:
+                evicted, self._evicted = self._evicted, []
+        self._close_later(evicted)
+        return result
+
+    def __setitem__(self, key, value):
+        self._mutate(super().__setitem__, key, value)
+
+    def pop(self, key, *default):
+        return self._mutate(super().pop, key, *default)
+
+    def popitem(self):
+        key, sess = super().popitem()
+        self._evicted.append(sess)
+        return key, sess
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self._evicted.extend(sess for _, sess in expired)
+        return expired
+
+    @staticmethod
+    def _close_later(evicted):
+        """Schedule evicted contexts to close on main_loop, outside the lock and the cache mutation."""
+        for sess in evicted:
+            context = sess.get("context") if isinstance(sess, dict) else None
+            if context is None or main_loop.is_closed():
+                continue
+            future = asyncio.run_coroutine_threadsafe(context.close(), main_loop)
+            future.add_done_callback(RPASessionCache._log_close_error)
+
+    @staticmethod
+    def _log_close_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            app.logger.warning(f"Error closing expired RPA session context: {future.exception()}")
+
+
+active_rpa_sessions = RPASessionCache(maxsize=1000, ttl=Config.RPA_TIMEOUT)  # If you want to keep the browser open
+
+# One Playwright driver and one browser per engine, shared by all RPA flows on main_loop;
+# each session only opens its own context.
+shared_browser = {"playwright": None, "browsers": {}}
+shared_browser_lock = asyncio.Lock()
+
+
+async def get_shared_browser(engine="chromium", **launch_kwargs):
+    """Return the shared browser for `engine`, starting Playwright/launching it on first use."""
+    async with shared_browser_lock:
+        browser = shared_browser["browsers"].get(engine)
+        if browser is not None and browser.is_connected():
+            return shared_browser["playwright"], browser
+        if shared_browser["playwright"] is None:
+            shared_browser["playwright"] = await async_playwright().start()
+        playwright = shared_browser["playwright"]
+        browser = await getattr(playwright, engine).launch(**launch_kwargs)
+        shared_browser["browsers"][engine] = browser
+        return playwright, browser
+
+
+# Cookies carried from one session to the next: consent banners and anti-bot clearance only.
+# Everything else (cart, checkout, login, localStorage) holds the previous customer's data.
+PERSISTED_COOKIE_PREFIXES = (
+    "OptanonConsent", "OptanonAlertBoxClosed", "notice_", "cookieconsent",
+    "cf_clearance", "__cf_bm", "_abck", "bm_sz", "ak_bmsc", "datadome", "incap_ses", "visid_incap",
+)
+
+
+async def new_session_context(carrier, browser, **context_options):
+    """A fresh context for one customer's session, seeded with the carrier's saved consent/anti-bot cookies."""
+    state_path = Config.BROWSER_STATE_DIR / f"state_{carrier}.json"
+    return await browser.new_context(
+        storage_state=str(state_path) if state_path.exists() else None,
+        **context_options
+    )
+
+
+async def save_storage_state(carrier, context):
+    """Persist the context's consent/anti-bot cookies (nothing customer-specific) for later sessions."""
+    state = await context.storage_state()
+    cookies = [c for c in state.get("cookies", []) if c["name"].startswith(PERSISTED_COOKIE_PREFIXES)]
+    state_path = Config.BROWSER_STATE_DIR / f"state_{carrier}.json"
+    state_path.write_text(json.dumps({"cookies": cookies, "origins": []}))
+
+
+async def close_shared_browsers():
+    """Close every shared browser and stop the Playwright driver."""
+    async with shared_browser_lock:
+        for browser in shared_browser["browsers"].values():
+            try:
+                await browser.close()
+            except Exception as e:
+                app.logger.warning(f"Error closing shared browser: {e}")
+        shared_browser["browsers"].clear()
+        if shared_browser["playwright"] is not None:
+            await shared_browser["playwright"].stop()
+            shared_browser["playwright"] = None
+
+
+@atexit.register
+def shutdown_shared_browsers():
+    if shared_browser["playwright"] is not None and not main_loop.is_closed():
+        main_loop.run_until_complete(close_shared_browsers())
 
 
 # -------------------------------------------------------------------------
@@ -200,8 +375,7 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
       8) Final submission
       No pausing at credit-check.
     """
-    from datetime import datetime
-    start_time = datetime.now()
+    start_ns = time.perf_counter_ns()
     app.logger.info(f"=== koodo_flow_full CALLED === (session {session_id})")
     app.logger.info(f"User data: {user_data}")
     app.logger.info(f"Plan info: {plan_info}")
@@ -228,22 +402,32 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
     browser_resources = {"playwright": None, "browser": None, "context": None, "page": None}
 
     def check_timeout():
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
         if elapsed > timeout_seconds:
             raise TimeoutError(f"Koodo flow timed out after {elapsed:.1f} seconds")
 
-    try:
-        # Launch browser
-        from playwright.async_api import async_playwright
-        playwright = await async_playwright().start()
-        browser_resources["playwright"] = playwright
+    # Progress screenshots run in the background (at most 4 at once) and are awaited in `finally`
+    pending_screenshots = []
+    screenshot_slots = asyncio.Semaphore(4)
+
+    async def capture_screenshot(path):
+        async with screenshot_slots:
+            await browser_resources["page"].screenshot(path=path, type="jpeg", quality=Config.SCREENSHOT_JPEG_QUALITY)
+            app.logger.info(f"Saved screenshot {path}")
 
-        browser = await playwright.chromium.launch(
-            channel="chrome", headless=False, slow_mo=100
+    def take_screenshot(path):
+        pending_screenshots.append(asyncio.create_task(capture_screenshot(path)))
+
+    try:
+        # Reuse the shared browser; only the context is per session
+        playwright, browser = await get_shared_browser(
+            "chromium", channel="chrome", headless=False, slow_mo=100
         )
+        browser_resources["playwright"] = playwright
         browser_resources["browser"] = browser
 
-        context = await browser.new_context(
+        context = await new_session_context(
+            "koodo", browser,
             user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
                         " AppleWebKit/537.36 (KHTML, like Gecko)"
                         " Chrome/114.0.0.0 Safari/537.36"),
@@ -292,9 +476,7 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
 
         # 2) Select plan
         check_timeout()
-        screenshot_path = f"logs/koodo_initial_page_{session_id}.png"
-        await page.screenshot(path=screenshot_path)
-        app.logger.info(f"Saved initial page screenshot {screenshot_path}")
+        take_screenshot(Config.SCREENSHOT_DIR / f"koodo_initial_page_{session_id}.jpg")
 
         def normalize_text(t):
             t = t.lower().strip()
@@ -677,7 +859,9 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
             app.logger.warning(f"Error clicking final Next/Continue: {e}")
 
         app.logger.info("Koodo flow done in one pass (no pause).")
+        await save_storage_state("koodo", context)
         active_rpa_sessions[session_id] = {
+            "carrier": "koodo",
             "playwright": playwright,
             "browser": browser,
             "context": context,
@@ -688,7 +872,8 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
         app.logger.error(f"Koodo flow timed out: {te}")
         if browser_resources["page"]:
             try:
-                await browser_resources["page"].screenshot(path=f"logs/koodo_timeout_{session_id}.png")
+                await browser_resources["page"].screenshot(path=Config.SCREENSHOT_DIR / f"koodo_timeout_{session_id}.jpg",
+                                                           type="jpeg", quality=Config.SCREENSHOT_JPEG_QUALITY)
                 app.logger.info("Saved Koodo timeout screenshot.")
             except Exception as e:
                 app.logger.warning(f"Screenshot failed: {e}")
@@ -698,14 +883,18 @@ async def koodo_flow_full(session_id: str, user_data: dict, plan_info: dict, tim
         app.logger.error(f"Unexpected error in Koodo flow: {e}")
         if browser_resources["page"]:
             try:
-                await browser_resources["page"].screenshot(path=f"logs/koodo_error_{session_id}.png")
+                await browser_resources["page"].screenshot(path=Config.SCREENSHOT_DIR / f"koodo_error_{session_id}.jpg",
+                                                           type="jpeg", quality=Config.SCREENSHOT_JPEG_QUALITY)
                 app.logger.info("Saved Koodo error screenshot.")
             except Exception as se:
                 app.logger.warning(f"Screenshot failed: {se}")
         raise e
 
     finally:
-        elapsed = (datetime.now() - start_time).total_seconds()
+        for result in await asyncio.gather(*pending_screenshots, return_exceptions=True):
+            if isinstance(result, Exception):
+                app.logger.warning(f"Screenshot failed: {result}")
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
         app.logger.info(f"Koodo flow completed after {elapsed:.1f} seconds")
 
 
@@ -722,11 +911,10 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
       5) Final submission
       No pause at credit-check.
     """
-    from datetime import datetime
-    start_time = datetime.now()
-    print("=== virgin_flow_full CALLED === session:", session_id)
-    print("User data:", user_data)
-    print("Plan info:", plan_info)
+    start_ns = time.perf_counter_ns()
+    app.logger.info("=== virgin_flow_full CALLED === session: %s", session_id)
+    app.logger.debug("User data: %s", user_data)
+    app.logger.debug("Plan info: %s", plan_info)
 
     first_name = user_data.get("first_name", "")
     last_name = user_data.get("last_name", "")
@@ -749,11 +937,11 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
     browser_resources = {}
 
     try:
-        playwright = await async_playwright().start()
-        browser = await playwright.chromium.launch(
-            channel="chrome", headless=False, slow_mo=100
+        playwright, browser = await get_shared_browser(
+            "chromium", channel="chrome", headless=False, slow_mo=100
         )
-        context = await browser.new_context(
+        context = await new_session_context(
+            "virgin", browser,
             user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
                         " AppleWebKit/537.36 (KHTML, like Gecko)"
                         " Chrome/114.0.0.0 Safari/537.36"),
@@ -764,7 +952,7 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
         # 1) Navigate to Virgin BYOP
         start_url = "https://www.virginplus.ca/en/plans/postpaid.html#!/BYOP/research"
         await page.goto(start_url, wait_until="networkidle", timeout=60000)
-        print("Navigated to Virgin BYOP offers page.")
+        app.logger.debug("Navigated to Virgin BYOP offers page.")
         await page.wait_for_timeout(10000)
 
         # 2) Select plan (similar to old code)
@@ -790,7 +978,7 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
                 container_count = len(containers)
 
         if container_count == 0:
-            print(f"No container found for plan: '{plan_name}'.")
+            app.logger.warning("No container found for plan: '%s'.", plan_name)
         else:
             selected_container = None
             for idx, c in enumerate(containers):
@@ -804,7 +992,7 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
                 select_button = selected_container.locator("a[role=button]:has-text('Select plan')")
                 if await select_button.count() > 0:
                     await select_button.first.click(force=True)
-                    print(f"Clicked 'Select plan' for: {plan_name}")
+                    app.logger.debug("Clicked 'Select plan' for: %s", plan_name)
 
         await page.wait_for_timeout(3000)
 
@@ -813,7 +1001,7 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             got_started_btn = await page.get_by_prompt("Get Started")
             if got_started_btn:
                 await got_started_btn.click(force=True)
-                print("Clicked 'Get Started' from popup.")
+                app.logger.debug("Clicked 'Get Started' from popup.")
         except:
             pass
         await page.wait_for_timeout(10000)
@@ -823,9 +1011,9 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             next_step1 = await page.get_by_prompt("Next Step")
             if next_step1:
                 await next_step1.click(force=True)
-                print("Clicked first 'Next Step'.")
+                app.logger.debug("Clicked first 'Next Step'.")
         except Exception as e:
-            print("Error clicking first 'Next Step':", e)
+            app.logger.warning("Error clicking first 'Next Step': %s", e)
         await page.wait_for_timeout(5000)
 
         # Possibly handle "Order a SIM card"
@@ -833,9 +1021,9 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             order_sim = await page.get_by_prompt("Order a SIM card")
             if order_sim:
                 await order_sim.click(force=True)
-                print("Clicked 'Order a SIM card'.")
+                app.logger.debug("Clicked 'Order a SIM card'.")
         except Exception as e:
-            print("Error clicking 'Order a SIM card':", e)
+            app.logger.warning("Error clicking 'Order a SIM card': %s", e)
         await page.wait_for_timeout(5000)
 
         # Possibly handle "Add to cart"
@@ -843,21 +1031,21 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             add_to_cart = await page.get_by_prompt("Add to cart")
             if add_to_cart:
                 await add_to_cart.click(force=True)
-                print("Clicked 'Add to cart'.")
+                app.logger.debug("Clicked 'Add to cart'.")
         except Exception as e:
-            print("Error clicking 'Add to cart':", e)
+            app.logger.warning("Error clicking 'Add to cart': %s", e)
         await page.wait_for_timeout(5000)
 
         try:
             proceed_checkout = await page.get_by_prompt("Proceed to checkout")
             if proceed_checkout:
                 await proceed_checkout.click(force=True)
-                print("Clicked 'Proceed to checkout'.")
+                app.logger.debug("Clicked 'Proceed to checkout'.")
         except Exception as e:
-            print("Error clicking 'Proceed to checkout':", e)
+            app.logger.warning("Error clicking 'Proceed to checkout': %s", e)
         await page.wait_for_timeout(5000)
 
-        print("Filling personal info on Virgin page...")
+        app.logger.debug("Filling personal info on Virgin page...")
         await page.wait_for_timeout(5000)
 
         # 3) Fill personal info
@@ -918,7 +1106,7 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             confirm_add_btn = await page.get_by_prompt("Confirm")
             if confirm_add_btn:
                 await confirm_add_btn.click(force=True)
-                print("Clicked 'Confirm' on popup.")
+                app.logger.debug("Clicked 'Confirm' on popup.")
         except:
             pass
         await page.wait_for_timeout(10000)
@@ -951,12 +1139,12 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
                 count = await checkbox_locator.count()
                 if count > 0:
                     await checkbox_locator.first.click(force=True)
-                    print("Checked the T&C checkbox.")
+                    app.logger.debug("Checked the T&C checkbox.")
                 else:
-                    print("No T&C checkbox found with that selector.")
+                    app.logger.warning("No T&C checkbox found with that selector.")
                 await page.wait_for_timeout(3000)
             except Exception as e:
-                print("Error checking T&C checkbox:", e)
+                app.logger.warning("Error checking T&C checkbox: %s", e)
             try:
                 confirm_transfer_btn = await page.get_by_prompt("Confirm number transfer")
                 if confirm_transfer_btn:
@@ -984,11 +1172,11 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             credit_continue_btn = await page.get_by_prompt("Continue")
             if credit_continue_btn:
                 await credit_continue_btn.click(force=True)
-                print("Clicked 'Continue' to proceed to the credit-check page.")
+                app.logger.debug("Clicked 'Continue' to proceed to the credit-check page.")
             else:
-                print("Could not find 'Continue' button for credit-check page.")
+                app.logger.warning("Could not find 'Continue' button for credit-check page.")
         except Exception as e:
-            print("Error clicking 'Continue' for credit check:", e)
+            app.logger.warning("Error clicking 'Continue' for credit check: %s", e)
         await page.wait_for_timeout(5000)
         # 4) Fill credit card info + DOB here, in the same pass (like old resume_credit_check_flow for Virgin)
         if "/" in card_expiry:
@@ -1010,9 +1198,9 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             month_option = page.locator(f'li[role="option"] >> text="{month_digits}"')
             await month_option.first.wait_for(state="attached", timeout=5000)
             await month_option.first.click(force=True)
-            print(f"Selected month: {month_digits}")
+            app.logger.debug("Selected month: %s", month_digits)
         except Exception as e:
-            print(f"Error selecting Virgin month {month_digits}: {str(e)}")
+            app.logger.warning("Error selecting Virgin month %s: %s", month_digits, e)
 
             # Fill expiry year
         try:
@@ -1022,9 +1210,9 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             year_option = page.locator(f'li[role="option"] >> text="{year_full}"')
             await year_option.first.wait_for(state="visible", timeout=5000)
             await hover_and_click_element(page, year_option.first, random_offset=2)
-            print(f"Selected year: {year_full}")
+            app.logger.debug("Selected year: %s", year_full)
         except Exception as e:
-            print(f"Error selecting Virgin year '{year_full}': {str(e)}")
+            app.logger.warning("Error selecting Virgin year '%s': %s", year_full, e)
 
             # Card number
         try:
@@ -1032,47 +1220,49 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
             if card_number_field:
                 await card_number_field.fill(card_number)
                 masked = "**** **** **** " + card_number[-4:] if len(card_number) >= 4 else "****"
-                print(f"Filled card number with: {masked}")
+                app.logger.debug("Filled card number with: %s", masked)
             else:
-                print("Card number field not found.")
+                app.logger.warning("Card number field not found.")
         except Exception as e:
-            print(f"Error filling card number: {str(e)}")
+            app.logger.warning("Error filling card number: %s", e)
 
             # CVV
         try:
             cvv_field = await page.get_by_prompt("Card security code")
             if cvv_field:
                 await cvv_field.fill(cvv)
-                print("Filled card security code.")
+                app.logger.debug("Filled card security code.")
             else:
-                print("Card security code field not found.")
+                app.logger.warning("Card security code field not found.")
         except Exception as e:
-            print(f"Error filling card security code: {str(e)}")
+            app.logger.warning("Error filling card security code: %s", e)
 
             # DOB
         try:
             dob_field = await page.get_by_prompt("Date of birth")
             if dob_field:
                 await dob_field.fill(dob)
-                print(f"Filled date of birth with: {dob}")
+                app.logger.debug("Filled date of birth with: %s", dob)
             else:
-                print("Date of birth field not found.")
+                app.logger.warning("Date of birth field not found.")
         except Exception as e:
-            print(f"Error filling date of birth: {str(e)}")
+            app.logger.warning("Error filling date of birth: %s", e)
 
             # final submit/continue
         try:
             final_btn = page.locator("button:has-text('Submit'), button:has-text('Continue')").first
             if await final_btn.count() > 0:
                 await final_btn.click(force=True)
-                print("Clicked final submit/continue on Virgin form.")
+                app.logger.debug("Clicked final submit/continue on Virgin form.")
             else:
-                print("Final submit/continue button not found on Virgin form.")
+                app.logger.warning("Final submit/continue button not found on Virgin form.")
         except Exception as e:
-            print(f"Error clicking final Virgin button: {str(e)}")
+            app.logger.warning("Error clicking final Virgin button: %s", e)
 
-        print("Virgin flow done, in one pass, no pause.")
+        app.logger.debug("Virgin flow done, in one pass, no pause.")
+        await save_storage_state("virgin", context)
         browser_resources = {
+            "carrier": "virgin",
             "playwright": playwright,
             "browser": browser,
             "context": context,
@@ -1081,11 +1271,11 @@ async def virgin_flow_full(session_id: str, user_data: dict, plan_info: dict):
         active_rpa_sessions[session_id] = browser_resources
 
     except Exception as e:
-        print("Virgin flow error:", e)
+        app.logger.error("Virgin flow error: %s", e)
         raise e
     finally:
-        elapsed = (datetime.now() - start_time).total_seconds()
-        print(f"Virgin flow completed after {elapsed:.1f}s")
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        app.logger.info("Virgin flow completed after %.1fs", elapsed)
 
 
 # -------------------------------------------------------------------------
@@ -1109,12 +1299,8 @@ async def fido_flow_full(session_id: str, user_data: dict, plan_info: dict, time
       13) Fill credit evaluation: DOB (dropdowns), card info (typed slowly), ID type, ID number
       14) Final submission
     """
-    from datetime import datetime
-    import re
-    import random
-
     app.logger.info(f"=== fido_flow_full CALLED === (session {session_id})")
-    start_time = datetime.now()
+    start_ns = time.perf_counter_ns()
 
     # Extract user data
     email = user_data.get("email", "")
@@ -1142,7 +1328,7 @@ async def fido_flow_full(session_id: str, user_data: dict, plan_info: dict, time
     }
 
     def check_timeout():
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
         if elapsed > timeout_seconds:
             raise TimeoutError(f"Fido flow timed out after {elapsed:.1f} seconds")
 
@@ -1154,13 +1340,13 @@ async def fido_flow_full(session_id: str, user_data: dict, plan_info: dict, time
         return t
 
     try:
-        from playwright.async_api import async_playwright
-        from playwright_stealth import stealth_async
+        if stealth_async is None:
+            raise RuntimeError("playwright_stealth is not installed")
 
-        # 1) Launch browser with stealth (WebKit)
-        playwright = await async_playwright().start()
-        browser = await playwright.webkit.launch(headless=False, slow_mo=100)
-        context = await browser.new_context(
+        # 1) Shared WebKit browser, fresh context with stealth
+        playwright, browser = await get_shared_browser("webkit", headless=False, slow_mo=100)
+        context = await new_session_context(
+            "fido", browser,
             user_agent=(
                 "Mozilla/5.0 (Macintosh; Intel Mac OS X 13_0) AppleWebKit/605.1.15 (KHTML, like Gecko) "
                 "Version/15.0 Safari/604.1"
@@ -2244,24 +2430,35 @@ async def fido_flow_full(session_id: str, user_data: dict, plan_info: dict, time
         app.logger.warning(f"Error clicking final button on Fido credit page: {e}")
 
     app.logger.info("Fido flow done in one pass (no pause).")
+    await save_storage_state("fido", context)
     active_rpa_sessions[session_id] = {
+        "carrier": "fido",
         "playwright": playwright,
         "browser": browser,
         "context": context,
         "page": page
     }
-    elapsed = (datetime.now() - start_time).total_seconds()
+    elapsed = (time.perf_counter_ns() - start_ns) / 1e9
     app.logger.info(f"Fido flow completed after {elapsed:.1f} seconds")
 
 
 # -------------------------------------------------------------------------
 #                          FLASK ROUTES
 # -------------------------------------------------------------------------
+# Chat intents are matched on whole words, so "know" isn't a "no" and "yesterday" isn't a "yes"
+MESSAGE_WORD_RE = re.compile(r"[a-z]+")
+AFFIRMATIVE_REPLIES = frozenset(("yes", "y", "yeah", "sure", "ok"))
+NEGATIVE_REPLIES = frozenset(("no", "n", "nope"))
+FORM_SUBMITTED_WORDS = frozenset(("submitted", "details"))
+QUESTION_WORDS = frozenset(("question", "questions"))
+
+
 @app.route('/search', methods=['POST'])
 def search():
     global conversation_context
     data = request.json
     user_message = data.get('message', '').lower().strip()
+    message_words = frozenset(MESSAGE_WORD_RE.findall(user_message))
 
     # Log the user message for debugging
     app.logger.info(f"User message: {user_message}")
@@ -2274,14 +2471,14 @@ def search():
 
     # If awaiting yes/no to the greeting
     elif conversation_context["state"] == "awaiting_yes_no":
-        if "yes" in user_message or user_message in ["y", "yeah", "sure", "ok"]:
+        if message_words & AFFIRMATIVE_REPLIES:
             conversation_context["state"] = "collecting_details"
             response = "Great! Please provide your plan details in the form below."
             return jsonify({
                 "response": response,
                 "show_form": True  # Signal to the frontend to show the form
             })
-        elif "no" in user_message or user_message in ["n", "nope"]:
+        elif message_words & NEGATIVE_REPLIES:
             conversation_context["state"] = "casual_conversation"
             llama_response = llama_client.generate_response(
                 prompt="User said they don't want to provide plan details right now. Respond in a friendly way and ask what they'd like to know about mobile plans instead.",
@@ -2305,7 +2502,7 @@ def search():
     # If we're collecting details and the form has been submitted
     elif conversation_context["state"] == "collecting_details":
         # Check if the message indicates form submission
-        if "submitted" in user_message or "details" in user_message:
+        if message_words & FORM_SUBMITTED_WORDS:
             conversation_context["state"] = "recommending"
             return jsonify({
                 "response": "Thank you for providing your details! Let me analyze this information and find the best plans for you.",
@@ -2450,8 +2647,7 @@ def recommend_plan():
         return jsonify({"response": resp_text})
 
     except Exception as e:
-        app.logger.error(f"Error in recommend_plan: {str(e)}")
-        app.logger.error(traceback.format_exc())
+        app.logger.exception("Error in recommend_plan: %s", e)
         return jsonify({"response": "Error fetching recommendations. Please try again."})
 
 
@@ -2496,6 +2692,21 @@ def select_plan():
 # -------------------------------------------------------------------------
 #                 SINGLE CHECKOUT PAGE & SUBMISSION
 # -------------------------------------------------------------------------
+# Compiled once at import; checkout() only renders it
+CHECKOUT_TEMPLATE = app.jinja_env.get_template('checkout_form.html')
+
+
+@lru_cache(maxsize=256)
+def render_checkout_page(carrier, plan_name, plan_price, plan_data):
+    """The checkout page depends only on these plan fields, so repeat plans reuse the rendered HTML."""
+    return CHECKOUT_TEMPLATE.render(
+        carrier=carrier,
+        plan_name=plan_name,
+        plan_price=plan_price,
+        plan_data=plan_data
+    )
+
+
 @app.route('/checkout', methods=['GET'])
 def checkout():
     """
@@ -2509,431 +2720,40 @@ def checkout():
     plan_price = plan_info.get("plan_price", 0)
     plan_data = plan_info.get("plan_data", 0)
 
-    # Start HTML with static content
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Complete Your Activation</title>
-        <style>
-            * {
-                box-sizing: border-box;
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, 'Open Sans', sans-serif;
-            }
-            body {
-                margin: 0;
-                padding: 0;
-                background-color: #f5f5f7;
-                color: #333;
-                line-height: 1.5;
-            }
-            .container {
-                max-width: 1100px;
-                margin: 0 auto;
-                padding: 0 20px;
-            }
-            header {
-                background-color: white;
-                padding: 15px 0;
-                border-bottom: 1px solid #e1e1e1;
-            }
-            .header-content {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }
-            .logo {
-                font-size: 18px;
-                font-weight: 600;
-                color: #0066cc;
-            }
-            main {
-                padding: 40px 0;
-            }
-            .checkout-layout {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 30px;
-            }
-            .checkout-form {
-                flex: 1;
-                min-width: 300px;
-                background: white;
-                border-radius: 8px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                padding: 30px;
-            }
-            .checkout-summary {
-                width: 320px;
-                background: white;
-                border-radius: 8px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-                padding: 30px;
-                align-self: flex-start;
-            }
-            h1 {
-                font-size: 24px;
-                font-weight: 600;
-                margin: 0 0 30px 0;
-                color: #333;
-            }
-            h2 {
-                font-size: 18px;
-                font-weight: 600;
-                margin: 0 0 20px 0;
-                color: #333;
-            }
-            .section {
-                margin-bottom: 30px;
-                padding-bottom: 20px;
-                border-bottom: 1px solid #e1e1e1;
-            }
-            .section:last-child {
-                border-bottom: none;
-            }
-            .field-row {
-                margin-bottom: 15px;
-            }
-            .field-group {
-                display: flex;
-                gap: 15px;
-                margin-bottom: 15px;
-            }
-            .field {
-                flex: 1;
-            }
-            label {
-                display: block;
-                font-size: 14px;
-                font-weight: 500;
-                margin-bottom: 5px;
-                color: #555;
-            }
-            input, select {
-                width: 100%;
-                padding: 12px;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                font-size: 15px;
-                transition: border-color 0.2s;
-            }
-            input:focus, select:focus {
-                outline: none;
-                border-color: #0066cc;
-            }
-            select {
-                background-image: url("data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' width='16' height='16' viewBox='0 0 24 24' fill='none' stroke='%23666' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'%3E%3Cpolyline points='6 9 12 15 18 9'%3E%3C/polyline%3E%3C/svg%3E");
-                background-repeat: no-repeat;
-                background-position: right 12px center;
-                appearance: none;
-                padding-right: 40px;
-            }
-            .hidden {
-                display: none;
-            }
-            button {
-                background-color: #0066cc;
-                color: white;
-                border: none;
-                padding: 14px 20px;
-                border-radius: 4px;
-                font-size: 16px;
-                font-weight: 500;
-                cursor: pointer;
-                width: 100%;
-                transition: background-color 0.2s;
-            }
-            button:hover {
-                background-color: #0055aa;
-            }
-            .summary-item {
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 12px;
-                font-size: 15px;
-            }
-            .summary-total {
-                display: flex;
-                justify-content: space-between;
-                margin-top: 20px;
-                padding-top: 20px;
-                border-top: 1px solid #e1e1e1;
-                font-size: 18px;
-                font-weight: 600;
-            }
-            .security-badge {
-                display: flex;
-                align-items: center;
-                gap: 10px;
-                padding: 15px;
-                margin-top: 20px;
-                background-color: #f5f5f7;
-                border-radius: 4px;
-                font-size: 14px;
-                color: #666;
-            }
-            .badge-icon {
-                color: #0066cc;
-                font-size: 18px;
-            }
-            .plan-info {
-                padding: 15px 0;
-                margin-bottom: 15px;
-                border-bottom: 1px solid #e1e1e1;
-            }
-            .plan-title {
-                font-weight: 600;
-                margin-bottom: 5px;
-            }
-            .plan-details {
-                font-size: 14px;
-                color: #666;
-            }
-
-            @media (max-width: 768px) {
-                .checkout-layout {
-                    flex-direction: column;
-                }
-                .checkout-summary {
-                    width: 100%;
-                }
-                .field-group {
-                    flex-direction: column;
-                    gap: 15px;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <header>
-            <div class="container">
-                <div class="header-content">
-                    <div class="logo">Mark-1 Wireless</div>
-                </div>
-            </div>
-        </header>
-
-        <main>
-            <div class="container">
-                <h1>Complete Your Activation</h1>
-
-                <div class="checkout-layout">
-                    <div class="checkout-form">
-                        <form method="POST" action="/checkout_submit">
-    """
-
-    # Add the hidden fields
-    html += "<input type=\"hidden\" name=\"carrier\" value=\"" + carrier + "\">\n"
-    html += "<input type=\"hidden\" name=\"plan_name\" value=\"" + plan_name + "\">\n"
-    html += "<input type=\"hidden\" name=\"plan_price\" value=\"" + str(plan_price) + "\">\n"
-
-    # Continue with the static form
-    html += """                            
-                            <!-- Personal Information Section -->
-                            <div class="section">
-                                <h2>Personal Information</h2>
-
-                                <div class="field-group">
-                                    <div class="field">
-                                        <label for="first_name">First Name</label>
-                                        <input type="text" id="first_name" name="first_name" required>
-                                    </div>
-                                    <div class="field">
-                                        <label for="last_name">Last Name</label>
-                                        <input type="text" id="last_name" name="last_name" required>
-                                    </div>
-                                </div>
-
-                                <div class="field-row">
-                                    <label for="email">Email Address</label>
-                                    <input type="email" id="email" name="email" required>
-                                </div>
-
-                                <div class="field-row">
-                                    <label for="phone">Phone Number</label>
-                                    <input type="tel" id="phone" name="phone" required>
-                                </div>
-                            </div>
-
-                            <!-- Address Section -->
-                            <div class="section">
-                                <h2>Address</h2>
-
-                                <div class="field-row">
-                                    <label for="address">Street Address</label>
-                                    <input type="text" id="address" name="address" required>
-                                </div>
-
-                                <div class="field-group">
-                                    <div class="field">
-                                        <label for="city">City</label>
-                                        <input type="text" id="city" name="city" required>
-                                    </div>
-                                    <div class="field">
-                                        <label for="province">Province</label>
-                                        <select id="province" name="province" required>
-                                            <option value="">Select Province</option>
-                                            <option value="AB">Alberta</option>
-                                            <option value="BC">British Columbia</option>
-                                            <option value="MB">Manitoba</option>
-                                            <option value="NB">New Brunswick</option>
-                                            <option value="NL">Newfoundland and Labrador</option>
-                                            <option value="NS">Nova Scotia</option>
-                                            <option value="NT">Northwest Territories</option>
-                                            <option value="NU">Nunavut</option>
-                                            <option value="ON">Ontario</option>
-                                            <option value="PE">Prince Edward Island</option>
-                                            <option value="QC">Quebec</option>
-                                            <option value="SK">Saskatchewan</option>
-                                            <option value="YT">Yukon</option>
-                                        </select>
-                                    </div>
-                                </div>
-
-                                <div class="field-row">
-                                    <label for="postal_code">Postal Code</label>
-                                    <input type="text" id="postal_code" name="postal_code" required>
-                                </div>
-                            </div>
-
-                            <!-- Phone Number Preference -->
-                            <div class="section">
-                                <h2>Phone Number Preference</h2>
-
-                                <div class="field-row">
-                                    <label for="number_preference">Number Preference</label>
-                                    <select id="number_preference" name="number_preference" required onchange="toggleTransferNumberField()">
-                                        <option value="">Select Preference</option>
-                                        <option value="new">Get a New Number</option>
-                                        <option value="transfer">Transfer My Existing Number</option>
-                                    </select>
-                                </div>
-
-                                <div id="transfer_number_field" class="field-row hidden">
-                                    <label for="transfer_number">Number to Transfer</label>
-                                    <input type="tel" id="transfer_number" name="transfer_number" placeholder="Enter the number you want to transfer">
-                                </div>
-                            </div>
-
-                            <!-- Credit Check Information -->
-                            <div class="section">
-                                <h2>Credit Check Information</h2>
-
-                                <div class="field-row">
-                                    <label for="dob">Date of Birth (YYYY-MM-DD)</label>
-                                    <input type="text" id="dob" name="dob" placeholder="YYYY-MM-DD" required>
-                                </div>
-    """
-
-    # Add ID Info section - only for non-Virgin carriers
-    if carrier != 'virgin':
-        html += """
-                                <!-- ID Information -->
-                                <div class="field-row">
-                                    <label for="id_type">ID Type</label>
-                                    <select id="id_type" name="id_type" required>
-                                        <option value="">Select ID Type</option>
-                                        <option value="drivers_license">Driver's License</option>
-                                        <option value="sin">Social Insurance Number (SIN)</option>
-                                    </select>
-                                </div>
-
-                                <div class="field-row">
-                                    <label for="id_number">ID Number</label>
-                                    <input type="text" id="id_number" name="id_number" required>
-                                </div>
-        """
+    return render_checkout_page(carrier, plan_name, plan_price, plan_data)
 
-    html += """
-                            </div>
-
-                            <!-- Payment Information -->
-                            <div class="section">
-                                <h2>Payment Information</h2>
-
-                                <div class="field-row">
-                                    <label for="card_number">Card Number</label>
-                                    <input type="text" id="card_number" name="card_number" placeholder="1234 5678 9012 3456" required>
-                                </div>
-
-                                <div class="field-group">
-                                    <div class="field">
-                                        <label for="card_expiry">Expiry Date (MM/YY)</label>
-                                        <input type="text" id="card_expiry" name="card_expiry" placeholder="MM/YY" required>
-                                    </div>
-                                    <div class="field">
-                                        <label for="cvv">Security Code (CVV)</label>
-                                        <input type="text" id="cvv" name="cvv" placeholder="123" required>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <button type="submit">Complete Activation</button>
-                        </form>
-                    </div>
-    """
 
-    # Add the order summary section with direct string concatenation
-    html += "<div class=\"checkout-summary\">\n"
-    html += "<h2>Order Summary</h2>\n"
-
-    html += "<div class=\"plan-info\">\n"
-    html += "<div class=\"plan-title\">" + carrier.capitalize() + " " + plan_name + "</div>\n"
-    html += "<div class=\"plan-details\">" + str(plan_data) + "GB Data Plan</div>\n"
-    html += "<div class=\"plan-price\">$" + str(plan_price) + "/mo</div>\n"
-    html += "</div>\n"
-
-    html += "<div class=\"summary-item\">\n"
-    html += "<span>Monthly fee</span>\n"
-    html += "<span>$" + str(plan_price) + "</span>\n"
-    html += "</div>\n"
-
-    html += "<div class=\"summary-item\">\n"
-    html += "<span>Activation fee</span>\n"
-    html += "<span>$0.00</span>\n"
-    html += "</div>\n"
-
-    html += "<div class=\"summary-item\">\n"
-    html += "<span>Estimated tax</span>\n"
-    html += "<span>$8.00</span>\n"
-    html += "</div>\n"
-
-    html += "<div class=\"summary-total\">\n"
-    html += "<span>Total</span>\n"
-    html += "<span>$" + str(plan_price) + "/mo</span>\n"
-    html += "</div>\n"
-
-    html += """
-                        <div class="security-badge">
-                            <span class="badge-icon">🔒</span>
-                            <span>Your payment information is securely encrypted</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </main>
-
-        <script>
-            function toggleTransferNumberField() {
-                const preference = document.getElementById('number_preference').value;
-                const transferField = document.getElementById('transfer_number_field');
-
-                if (preference === 'transfer') {
-                    transferField.classList.remove('hidden');
-                    document.getElementById('transfer_number').required = true;
-                } else {
-                    transferField.classList.add('hidden');
-                    document.getElementById('transfer_number').required = false;
-                }
-            }
-        </script>
-    </body>
-    </html>
-    """
+# Carrier -> coroutine for its full RPA flow; shared by checkout_submit and run_rpa_batch
+CARRIER_FLOWS = {
+    "koodo": lambda sid, ud, pi: koodo_flow_full(sid, ud, pi, timeout_seconds=Config.RPA_TIMEOUT),
+    "virgin": lambda sid, ud, pi: virgin_flow_full(sid, ud, pi),
+    "fido": lambda sid, ud, pi: fido_flow_full(sid, ud, pi, timeout_seconds=Config.RPA_TIMEOUT),
+}
 
-    return html
+# Values the checkout form's <select> fields can submit
+PROVINCE_CODES = frozenset(("AB", "BC", "MB", "NB", "NL", "NS", "NT", "NU", "ON", "PE", "QC", "SK", "YT"))
+NUMBER_PREFERENCES = frozenset(("new", "transfer"))
+ID_TYPES = frozenset(("drivers_license", "sin"))
+# Payment and ID fields go to the flow only; conversation_context is shared by every customer
+SENSITIVE_CHECKOUT_FIELDS = ("card_number", "card_expiry", "cvv", "id_type", "id_number")
+# Fields the checkout form marks required; the ID fields only apply to non-Virgin carriers
+REQUIRED_CHECKOUT_FIELDS = ("first_name", "last_name", "dob", "address", "city", "province", "postal_code",
+                            "email", "phone", "card_number", "card_expiry", "cvv", "number_preference")
+REQUIRED_ID_FIELDS = ("id_type", "id_number")
+
+
+def validate_checkout_data(carrier, user_data):
+    """Return an error message if user_data can't be sent to the carrier's flow, else None."""
+    required = REQUIRED_CHECKOUT_FIELDS if carrier == 'virgin' else REQUIRED_CHECKOUT_FIELDS + REQUIRED_ID_FIELDS
+    missing = [field for field in required if not user_data.get(field)]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    # Reject tampered select values here rather than part-way through a browser session
+    if (user_data["province"] not in PROVINCE_CODES
+            or user_data["number_preference"] not in NUMBER_PREFERENCES
+            or (carrier != 'virgin' and user_data["id_type"] not in ID_TYPES)):
+        return "Invalid province, number preference or ID type"
+    return None
 
 
 @app.route('/checkout_submit', methods=['POST'])
@@ -2966,7 +2786,7 @@ def checkout_submit():
         "postal_code": request.form.get('postal_code', ''),
         "email": request.form.get('email', ''),
         "phone": request.form.get('phone', ''),
-        "card_number": request.form.get('card_number', ''),
+        "card_number": request.form.get('card_number', '').translate(CARD_NUMBER_SEPARATORS),
         "card_expiry": request.form.get('card_expiry', ''),
         "cvv": request.form.get('cvv', ''),
         "number_preference": number_preference,
@@ -2980,56 +2800,84 @@ def checkout_submit():
             "id_number": request.form.get('id_number', ''),
         })
 
-    conversation_context["user_data"] = user_data
+    error = validate_checkout_data(carrier, user_data)
+    if error:
+        return jsonify({"status": "error", "message": error}), 400
+
+    # Merge into the existing dict so budget/data_usage from the plan-details form survive checkout,
+    # but never keep payment or ID details around for the next customer
+    context_user_data = conversation_context["user_data"]
+    for field in SENSITIVE_CHECKOUT_FIELDS:
+        context_user_data.pop(field, None)
+    context_user_data.update((k, v) for k, v in user_data.items() if k not in SENSITIVE_CHECKOUT_FIELDS)
 
     plan_info = {
         "plan_name": plan_name,
         "plan_price": float(plan_price),
     }
 
-    session_id = str(uuid.uuid4())
+    session_id = secrets.token_urlsafe(16)
     asyncio.set_event_loop(main_loop)
 
     try:
-        if carrier == 'koodo':
-            app.logger.info(f"Running Koodo flow in one pass for session {session_id}...")
-            main_loop.run_until_complete(
-                koodo_flow_full(session_id, user_data, plan_info, timeout_seconds=Config.RPA_TIMEOUT)
-            )
-            return jsonify({"status": "success",
-                            "message": "Koodo flow completed (no pause).",
-                            "session_id": session_id})
-
-        elif carrier == 'virgin':
-            app.logger.info(f"Running Virgin flow in one pass for session {session_id}...")
-            main_loop.run_until_complete(
-                virgin_flow_full(session_id, user_data, plan_info)
-            )
-            return jsonify({"status": "success",
-                            "message": "Virgin flow completed (no pause).",
-                            "session_id": session_id})
-
-        elif carrier == 'fido':
-            app.logger.info(f"Running Fido flow in one pass for session {session_id}...")
-            main_loop.run_until_complete(
-                fido_flow_full(session_id, user_data, plan_info, timeout_seconds=Config.RPA_TIMEOUT)
-            )
-            return jsonify({
-                "status": "success",
-                "message": "Fido flow completed (no pause).",
-                "session_id": session_id
-            })
-
-        else:
+        flow = CARRIER_FLOWS.get(carrier)
+        if flow is None:
             return jsonify({"status": "error",
                             "message": f"Unsupported carrier: {carrier}"}), 400
 
+        carrier_name = carrier.capitalize()
+        app.logger.info(f"Running {carrier_name} flow in one pass for session {session_id}...")
+        main_loop.run_until_complete(flow(session_id, user_data, plan_info))
+        return jsonify({"status": "success",
+                        "message": f"{carrier_name} flow completed (no pause).",
+                        "session_id": session_id})
+
     except Exception as e:
         app.logger.error(f"Flow error: {str(e)}")
         return jsonify({"status": "error",
                         "message": f"RPA error: {str(e)}"}), 500
 
 
+async def run_rpa_batch(session_specs):
+    """
+    Run several RPA sessions concurrently on the shared browsers, at most
+    Config.MAX_PARALLEL_PAGES at a time. Each spec is a dict with 'carrier',
+    'user_data' and 'plan_info'; returns one status dict per spec, in order.
+    Not exposed over HTTP: every session is a real, paid checkout.
+    """
+    semaphore = asyncio.Semaphore(Config.MAX_PARALLEL_PAGES)
+
+    async def run_one(spec):
+        if (not isinstance(spec, dict) or not isinstance(spec.get("user_data"), dict)
+                or not isinstance(spec.get("plan_info", {}), dict)):
+            return {"status": "error", "carrier": None,
+                    "message": "Session must be an object with 'user_data'/'plan_info' objects"}
+        carrier = str(spec.get("carrier", "")).lower()
+        flow = CARRIER_FLOWS.get(carrier)
+        if flow is None:
+            return {"status": "error", "carrier": carrier, "message": f"Unsupported carrier: {carrier}"}
+        # Same normalisation and checks as /checkout_submit, before any browser work starts
+        user_data = dict(spec["user_data"])
+        user_data["card_number"] = str(user_data.get("card_number", "")).translate(CARD_NUMBER_SEPARATORS)
+        if user_data.get("number_preference") == 'transfer' and not user_data.get("transfer_number"):
+            user_data["transfer_number"] = user_data.get("phone", '')
+        error = validate_checkout_data(carrier, user_data)
+        if error:
+            return {"status": "error", "carrier": carrier, "message": error}
+
+        session_id = secrets.token_urlsafe(16)
+        async with semaphore:
+            try:
+                await flow(session_id, user_data, spec.get("plan_info", {}))
+            except Exception as e:
+                app.logger.error(f"Batch flow error ({carrier}, session {session_id}): {str(e)}")
+                return {"status": "error", "carrier": carrier, "message": f"RPA error: {str(e)}",
+                        "session_id": session_id}
+        return {"status": "success", "carrier": carrier, "session_id": session_id}
+
+    return await asyncio.gather(*(run_one(spec) for spec in session_specs))
+
+
 # Optional function to close browser
 def cleanup_session(session_id):
     sess = active_rpa_sessions.pop(session_id, None)
@@ -3048,6 +2896,9 @@ class LlamaClient:
     def __init__(self, model_name="llama3.2-vision", api_url="http://localhost:11434"):
         self.model_name = model_name
         self.api_url = api_url
+        # Keep-alive connections to Ollama, shared by all request threads
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
 
     def generate_response(self, prompt, system="", temperature=0.7, max_tokens=1024):
         """Generate a response from the model"""
@@ -3067,7 +2918,7 @@ class LlamaClient:
 
         # Make the API call
         try:
-            response = requests.post(url, json=data, timeout=60)
+            response = self.session.post(url, json=data, timeout=60)
             if response.status_code == 200:
                 return response.json()["response"]
             else:
@@ -3122,6 +2973,28 @@ Example questions you can answer:
 - "Can I keep my phone number if I switch carriers?"
 """
 
+# chat_with_blue conversations by session_id; idle ones are dropped after SESSION_TIMEOUT
+blue_chat_contexts = TTLCache(maxsize=10000, ttl=Config.SESSION_TIMEOUT * 60)
+blue_chat_contexts_lock = threading.Lock()
+
+# Plan listing fed into Blue's system prompt, keyed on the plans_data frame it was built from
+blue_plan_context = {"source": None, "text": ""}
+
+
+def get_blue_plan_context():
+    """
+    First five Koodo/Virgin/Fido plans formatted for Blue's prompt. Built once per
+    loaded plans_data frame, so it only changes after /reload_csv swaps the frame.
+    """
+    if blue_plan_context["source"] is not plans_data:
+        plan_context = "Here is the current mobile plan information:\n\n"
+        for carrier in ('Koodo', 'Virgin', 'Fido'):
+            plan_context += f"\n{carrier.upper()} PLANS:\n"
+            for plan in plans_data[plans_data['carrier'] == carrier].head(5).to_dict('records'):
+                plan_context += f"- ${plan['price']}/month: {plan['data_gb']}GB data, {plan['text']} texting, {plan['talk']} talk time\n"
+        blue_plan_context.update(source=plans_data, text=plan_context)
+    return blue_plan_context["text"]
+
 
 def get_detailed_plan_info(query_text):
     """
@@ -3129,7 +3002,7 @@ def get_detailed_plan_info(query_text):
     This helps Blue provide more accurate and detailed responses.
     """
     try:
-        df = pd.read_csv('byop_plans.csv')
+        df = plans_data
 
         # Determine what the user is asking about
         query_lower = query_text.lower()
@@ -3226,27 +3099,33 @@ def get_detailed_plan_info(query_text):
 @app.route('/chat_with_blue', methods=['POST'])
 def chat_with_blue():
     """Endpoint to directly chat with Blue powered by Llama"""
-    data = request.json
+    # Decode the body once with the app's (orjson) provider; nothing else reads it, so don't cache it
+    try:
+        data = app.json.loads(request.get_data(cache=False))
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Request body must be a JSON object"}), 400
     user_message = data.get('message', '')
 
     if not user_message:
         return jsonify({"status": "error", "message": "No message provided"}), 400
+    message_lower = user_message.lower()
+    message_words = frozenset(MESSAGE_WORD_RE.findall(message_lower))
 
     # Get session data
-    session_id = data.get('session_id', str(uuid.uuid4()))
-
-    # Access the global conversation context to ensure state is maintained
-    global conversation_context
+    session_id = data.get('session_id') or secrets.token_urlsafe(16)
 
-    # Initialize conversation context if it doesn't exist
-    if not conversation_context:
-        conversation_context = {
+    # Each chat client has its own conversation, keyed by the session_id it echoes back
+    with blue_chat_contexts_lock:
+        conversation_context = blue_chat_contexts.get(session_id) or {
             "state": "greeting",
             "user_data": {},
             "past_messages": [],
             "selected_plan": None,
             "recommended_plans": []
         }
+        blue_chat_contexts[session_id] = conversation_context  # re-setting restarts the idle timer
 
     # Add the current message to past messages
     conversation_context["past_messages"].append({
@@ -3270,7 +3149,7 @@ def chat_with_blue():
 
     # Handle yes/no to the initial greeting prompt
     if conversation_context["state"] == "awaiting_yes_no":
-        if user_message.lower() in ["yes", "y", "yeah", "sure", "ok"]:
+        if message_lower in AFFIRMATIVE_REPLIES:
             # User said yes - trigger the plan details dialog
             conversation_context["state"] = "collecting_details"
             response = "Great! I'll help you find the perfect plan. Could you please tell me about your current plan? For example, how much data do you use, and what's your monthly budget?"
@@ -3283,7 +3162,7 @@ def chat_with_blue():
                 "response": response,
                 "session_id": session_id
             })
-        elif user_message.lower() in ["no", "n", "nope"]:
+        elif message_lower in NEGATIVE_REPLIES:
             # User said no - ask if they have any questions about plans
             conversation_context["state"] = "casual_conversation"
             response = "I understand you don't want to provide details right now. Do you have any questions about mobile plans that I can help you with?"
@@ -3332,11 +3211,11 @@ def chat_with_blue():
                 })
             except:
                 # If parsing fails, use basic text analysis
-                if "fido" in user_message.lower():
+                if "fido" in message_words:
                     conversation_context["user_data"]["current_carrier"] = "fido"
                 if "50" in user_message:
                     conversation_context["user_data"]["current_price"] = 50.0
-                if "40" in user_message and "gb" in user_message.lower():
+                if "40" in user_message and "gb" in message_lower:
                     conversation_context["user_data"]["current_data"] = 40.0
 
             # Move to recommendations if we have enough information
@@ -3390,7 +3269,7 @@ def chat_with_blue():
 
     # Handle plan selection and questions
     if conversation_context["state"] == "plan_selected":
-        if "question" in user_message.lower() or "?" in user_message:
+        if message_words & QUESTION_WORDS or "?" in user_message:
             # Use Llama to answer questions about the selected plan
             try:
                 selected_plan = conversation_context.get("selected_plan", {})
@@ -3438,7 +3317,7 @@ def chat_with_blue():
 
     # Handle plan finalization
     if conversation_context["state"] == "finalizing":
-        if user_message.lower() in ["yes", "y", "yeah", "sure", "ok"]:
+        if message_lower in AFFIRMATIVE_REPLIES:
             conversation_context["state"] = "checkout"
             response = "Great! I'll direct you to the checkout page to complete your plan selection."
             conversation_context["past_messages"].append({
@@ -3466,18 +3345,7 @@ def chat_with_blue():
     # For all other messages, use Llama's intelligence but respect the conversation state
     try:
         # Create a context-rich system prompt with plan details
-        plan_context = "Here is the current mobile plan information:\n\n"
-
-        # Add the plans information
-        df = pd.read_csv('byop_plans.csv')
-        koodo_plans = df[df['carrier'] == 'Koodo'].to_dict('records')
-        virgin_plans = df[df['carrier'] == 'Virgin'].to_dict('records')
-        fido_plans = df[df['carrier'] == 'Fido'].to_dict('records')
-
-        for carrier, plans in [('KOODO', koodo_plans), ('VIRGIN', virgin_plans), ('FIDO', fido_plans)]:
-            plan_context += f"\n{carrier} PLANS:\n"
-            for i, plan in enumerate(plans[:5]):
-                plan_context += f"- ${plan['price']}/month: {plan['data_gb']}GB data, {plan['text']} texting, {plan['talk']} talk time\n"
+        plan_context = get_blue_plan_context()
 
         # Create an enhanced system prompt that respects the current state
         state_info = f"Current conversation state: {conversation_context['state']}\n"
@@ -3520,8 +3388,7 @@ def chat_with_blue():
             "session_id": session_id
         })
     except Exception as e:
-        app.logger.error(f"Error in chat_with_blue: {str(e)}")
-        app.logger.error(traceback.format_exc())
+        app.logger.exception("Error in chat_with_blue: %s", e)
         response = "I'm having trouble processing your request. Please try again."
         conversation_context["past_messages"].append({
             "role": "assistant",
@@ -3538,305 +3405,18 @@ def chat_with_blue():
 #                      LLAMA INTEGRATION FOR BLUE - UI
 # -------------------------------------------------------------------------
 
+def read_static_page(name):
+    """Raw bytes of a fixed HTML page under templates/, read once at import and served as-is."""
+    return (Path(app.root_path) / app.template_folder / name).read_bytes()
+
+
+BLUE_CHAT_INTERFACE_PAGE = read_static_page("blue_chat_interface.html")
+
+
 @app.route('/blue_chat_interface', methods=['GET'])
 def blue_chat_interface():
     """Serves a simple HTML interface for chatting with Blue"""
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Chat with Blue - Mobile Plan Assistant</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body {
-                font-family: 'Arial', sans-serif;
-                margin: 0;
-                padding: 0;
-                background-color: #f5f5f5;
-                color: #333;
-                line-height: 1.6;
-            }
-            .container {
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-            }
-            .header {
-                background-color: #0047AB;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 8px 8px 0 0;
-            }
-            .chat-container {
-                background-color: white;
-                border-radius: 0 0 8px 8px;
-                box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-                overflow: hidden;
-            }
-            .chat-messages {
-                padding: 20px;
-                max-height: 400px;
-                overflow-y: auto;
-            }
-            .message {
-                margin-bottom: 15px;
-                padding: 10px 15px;
-                border-radius: 18px;
-                max-width: 75%;
-                word-wrap: break-word;
-            }
-            .user-message {
-                background-color: #e6f7ff;
-                margin-left: auto;
-                border-bottom-right-radius: 4px;
-            }
-            .assistant-message {
-                background-color: #f0f0f0;
-                margin-right: auto;
-                border-bottom-left-radius: 4px;
-            }
-            .message-input {
-                display: flex;
-                padding: 15px;
-                background-color: #f9f9f9;
-                border-top: 1px solid #eee;
-            }
-            #user-input {
-                flex: 1;
-                padding: 12px;
-                border: 1px solid #ddd;
-                border-radius: 20px;
-                font-size: 16px;
-                outline: none;
-            }
-            #send-button {
-                background-color: #0047AB;
-                color: white;
-                border: none;
-                padding: 12px 20px;
-                margin-left: 10px;
-                border-radius: 20px;
-                cursor: pointer;
-                font-size: 16px;
-            }
-            #send-button:hover {
-                background-color: #003d91;
-            }
-            .blue-avatar, .user-avatar {
-                width: 30px;
-                height: 30px;
-                border-radius: 50%;
-                display: inline-block;
-                margin-right: 10px;
-                vertical-align: middle;
-                background-size: cover;
-                background-position: center;
-            }
-            .blue-avatar {
-                background-color: #0047AB;
-                color: white;
-                text-align: center;
-                line-height: 30px;
-                font-weight: bold;
-            }
-            .user-avatar {
-                background-color: #4CAF50;
-                color: white;
-                text-align: center;
-                line-height: 30px;
-                font-weight: bold;
-            }
-            .message-container {
-                display: flex;
-                align-items: flex-start;
-                margin-bottom: 15px;
-            }
-            .message-content {
-                padding: 10px 15px;
-                border-radius: 18px;
-                max-width: 75%;
-                word-wrap: break-word;
-            }
-            .user-container {
-                margin-left: auto;
-                flex-direction: row-reverse;
-            }
-            .user-container .message-content {
-                background-color: #e6f7ff;
-                border-bottom-right-radius: 4px;
-                margin-left: 10px;
-            }
-            .assistant-container .message-content {
-                background-color: #f0f0f0;
-                border-bottom-left-radius: 4px;
-                margin-right: 10px;
-            }
-            .typing-indicator {
-                display: none;
-                padding: 10px 15px;
-                background-color: #f0f0f0;
-                border-radius: 18px;
-                border-bottom-left-radius: 4px;
-                max-width: 75%;
-                margin-right: auto;
-            }
-            .dot {
-                display: inline-block;
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background-color: #888;
-                margin-right: 3px;
-                animation: wave 1.3s linear infinite;
-            }
-            .dot:nth-child(2) {
-                animation-delay: -1.1s;
-            }
-            .dot:nth-child(3) {
-                animation-delay: -0.9s;
-            }
-            @keyframes wave {
-                0%, 60%, 100% { transform: initial; }
-                30% { transform: translateY(-5px); }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Chat with Blue</h1>
-                <p>Your AI Mobile Plan Assistant</p>
-            </div>
-            <div class="chat-container">
-                <div class="chat-messages" id="chat-messages">
-                    <div class="message-container assistant-container">
-                        <div class="blue-avatar">B</div>
-                        <div class="message-content">
-                            Hi, I'm Blue! I can help you find the perfect mobile plan. What are you looking for today?
-                        </div>
-                    </div>
-                </div>
-                <div class="typing-indicator" id="typing-indicator">
-                    <div class="dot"></div>
-                    <div class="dot"></div>
-                    <div class="dot"></div>
-                </div>
-                <div class="message-input">
-                    <input type="text" id="user-input" placeholder="Type your message here..." autocomplete="off">
-                    <button id="send-button">Send</button>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            document.addEventListener('DOMContentLoaded', function() {
-                const userInput = document.getElementById('user-input');
-                const sendButton = document.getElementById('send-button');
-                const chatMessages = document.getElementById('chat-messages');
-                const typingIndicator = document.getElementById('typing-indicator');
-
-                let pastMessages = [];
-                let sessionId = null;
-
-                // Function to add a message to the chat window
-                function addMessage(message, isUser = false) {
-                    const messageContainer = document.createElement('div');
-                    messageContainer.className = isUser ? 'message-container user-container' : 'message-container assistant-container';
-
-                    const avatar = document.createElement('div');
-                    avatar.className = isUser ? 'user-avatar' : 'blue-avatar';
-                    avatar.textContent = isUser ? 'U' : 'B';
-
-                    const messageContent = document.createElement('div');
-                    messageContent.className = 'message-content';
-                    messageContent.textContent = message;
-
-                    messageContainer.appendChild(avatar);
-                    messageContainer.appendChild(messageContent);
-                    chatMessages.appendChild(messageContainer);
-
-                    // Auto-scroll to the bottom
-                    chatMessages.scrollTop = chatMessages.scrollHeight;
-
-                    // Add to past messages
-                    pastMessages.push({
-                        role: isUser ? 'user' : 'assistant',
-                        content: message
-                    });
-                }
-
-                // Function to send message to Blue
-                async function sendMessageToBlue(message) {
-                    // Show typing indicator
-                    typingIndicator.style.display = 'block';
-
-                    try {
-                        const response = await fetch('/chat_with_blue', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json'
-                            },
-                            body: JSON.stringify({
-                                message: message,
-                                past_messages: pastMessages,
-                                session_id: sessionId
-                            })
-                        });
-
-                        const data = await response.json();
-
-                        // Hide typing indicator
-                        typingIndicator.style.display = 'none';
-
-                        if (data.status === 'success') {
-                            // Save session ID if first time
-                            if (!sessionId) {
-                                sessionId = data.session_id;
-                            }
-
-                            // Add Blue's response to the chat
-                            addMessage(data.response, false);
-                        } else {
-                            addMessage('Sorry, I encountered an error. Please try again.', false);
-                        }
-                    } catch (error) {
-                        console.error('Error:', error);
-                        typingIndicator.style.display = 'none';
-                        addMessage('Sorry, I encountered an error. Please try again.', false);
-                    }
-                }
-
-                // Handle send button click
-                sendButton.addEventListener('click', () => {
-                    const message = userInput.value.trim();
-                    if (message) {
-                        addMessage(message, true);
-                        userInput.value = '';
-                        sendMessageToBlue(message);
-                    }
-                });
-
-                // Handle Enter key press
-                userInput.addEventListener('keypress', (e) => {
-                    if (e.key === 'Enter') {
-                        const message = userInput.value.trim();
-                        if (message) {
-                            addMessage(message, true);
-                            userInput.value = '';
-                            sendMessageToBlue(message);
-                        }
-                    }
-                });
-
-                // Focus the input field when the page loads
-                userInput.focus();
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return html
+    return Response(BLUE_CHAT_INTERFACE_PAGE, mimetype="text/html")
 
 
 # -------------------------------------------------------------------------
@@ -3846,113 +3426,12 @@ if __name__ == "__main__":
     app.run(debug=True)
 
 
+INDEX_PAGE = read_static_page("index.html")
+
+
 @app.route('/', methods=['GET'])
 def index():
     """Home page with links to various parts of the application"""
-    html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Mobile Plan Assistant</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body {
-                font-family: 'Arial', sans-serif;
-                margin: 0;
-                padding: 0;
-                background-color: #f5f5f5;
-                color: #333;
-                line-height: 1.6;
-            }
-            .container {
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-            }
-            .header {
-                background-color: #0047AB;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 8px 8px 0 0;
-            }
-            .content {
-                background-color: white;
-                border-radius: 0 0 8px 8px;
-                box-shadow: 0 2px 10px rgba(0, 0, 0, 0.1);
-                padding: 20px;
-            }
-            .feature-card {
-                border: 1px solid #eee;
-                border-radius: 8px;
-                padding: 20px;
-                margin-bottom: 20px;
-                transition: transform 0.3s, box-shadow 0.3s;
-            }
-            .feature-card:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.1);
-            }
-            h2 {
-                color: #0047AB;
-                margin-top: 0;
-            }
-            .btn {
-                display: inline-block;
-                background-color: #0047AB;
-                color: white;
-                padding: 10px 20px;
-                text-decoration: none;
-                border-radius: 20px;
-                margin-top: 10px;
-                transition: background-color 0.3s;
-            }
-            .btn:hover {
-                background-color: #003d91;
-            }
-            .new-badge {
-                background-color: #FF4500;
-                color: white;
-                font-size: 12px;
-                padding: 3px 8px;
-                border-radius: 10px;
-                margin-left: 10px;
-                vertical-align: middle;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Mobile Plan Assistant</h1>
-                <p>Find and compare the best mobile plans for your needs</p>
-            </div>
-            <div class="content">
-                <div class="feature-card">
-                    <h2>Chat with Blue <span class="new-badge">NEW</span></h2>
-                    <p>Talk to our AI assistant Blue to get personalized recommendations and answers about mobile plans.</p>
-                    <p>Ask anything about plans, carriers, features, and get intelligent, helpful responses.</p>
-                    <a href="/blue_chat_interface" class="btn">Start Chatting</a>
-                </div>
-
-                <div class="feature-card">
-                    <h2>Plan Search</h2>
-                    <p>Search for mobile plans based on your specific requirements.</p>
-                    <p>Filter by data usage, price, carrier, and more to find the perfect match.</p>
-                    <a href="/search" class="btn">Search Plans</a>
-                </div>
-
-                <div class="feature-card">
-                    <h2>Plan Recommendations</h2>
-                    <p>Get personalized plan recommendations based on your usage patterns.</p>
-                    <p>Tell us what you need and we'll find the best options for you.</p>
-                    <a href="/recommend_plan" class="btn">Get Recommendations</a>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    return html
+    return Response(INDEX_PAGE, mimetype="text/html")
 
 # -------------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Pieces shared by backend.py and new_backend.py.
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Spaces/dashes users type into the card number field (the placeholder shows them grouped)
+CARD_NUMBER_SEPARATORS = str.maketrans('', '', ' -')
+
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """
+    request.json / get_json and jsonify through orjson. Keys stay sorted like the default
+    provider, and datetimes still go through DefaultJSONProvider.default (HTTP date format)
+    instead of orjson's native ISO 8601.
+    """
+    dump_options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                    | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def dumps(self, obj, **kwargs):
+        default = kwargs.get("default", self.default)
+        indent = kwargs.get("indent")
+        # response() passes compact separators, or indent=2 in debug; orjson covers both
+        supported = (set(kwargs) <= {"default", "indent", "separators"}
+                     and indent in (None, 2)
+                     and kwargs.get("separators") in (None, (",", ":")))
+        if not supported:
+            # ensure_ascii, cls, other indents, ... have no orjson equivalent; let the stdlib handle them
+            return super().dumps(obj, **kwargs)
+        option = self.dump_options if self.sort_keys else self.dump_options & ~orjson.OPT_SORT_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
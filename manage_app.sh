@@ -14,7 +14,7 @@ function show_usage {
   echo "  restart   - Restart the SwitchMyPlan service"
   echo "  status    - Check the status of the SwitchMyPlan service"
   echo "  logs      - View the last 50 log entries"
-  echo "  update    - Update the application (copies new_backend.py and requirements.txt)"
+  echo "  update    - Update the application (copies new_backend.py, common.py and requirements.txt)"
   echo "  check     - Check if port 5000 is open and the service is responding"
   echo "  help      - Show this help message"
 }
@@ -57,8 +57,8 @@ case "$1" in
 
   update)
     echo "Updating SwitchMyPlan application..."
-    # Copy the updated backend file and requirements
-    scp -i $KEY_PATH new_backend.py $SERVER_USER@$SERVER_ADDRESS:~/switchmyplan/
+    # Copy the updated backend files and requirements
+    scp -i $KEY_PATH new_backend.py common.py $SERVER_USER@$SERVER_ADDRESS:~/switchmyplan/
     scp -i $KEY_PATH requirements.txt $SERVER_USER@$SERVER_ADDRESS:~/switchmyplan/
     
     # Update dependencies if needed
@@ -8,14 +8,16 @@ from flask import Flask, request, jsonify, redirect, Response, send_from_directo
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask_caching import Cache
 from flask import Flask, jsonify, send_file, send_from_directory, request
 import agentql
 from playwright.async_api import async_playwright
-import uuid
+import secrets
+import hashlib
 import re
 import random
+import heapq
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import time
 from playwright_stealth import stealth_async
@@ -36,10 +38,23 @@ from werkzeug.middleware.profiler import ProfilerMiddleware
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 from functools import wraps
+from operator import itemgetter
+from typing import Optional, Union
+from common import CARD_NUMBER_SEPARATORS, OrjsonJSONProvider
 import bleach
 from flask_compress import Compress
 import psutil
 
+from numba import njit
+import orjson
+import xxhash
+import msgspec
+
+PLAN_STRING_DTYPE = "string[pyarrow]"
+# Arrow's multithreaded parser only: the default NumPy dtypes keep empty cells and ids
+# ('7.0') exactly as the C parser reads them
+PLAN_CSV_OPTIONS = {"engine": "pyarrow"}
+
 # Initialize Sentry for error tracking
 sentry_sdk.init(
     dsn=os.environ.get('SENTRY_DSN'),
@@ -48,67 +63,6 @@ sentry_sdk.init(
     environment=os.environ.get('FLASK_ENV', 'production')
 )
 
-# Plans cache setup
-plans_cache = {
-    'data': None,
-    'last_refresh': 0
-}
-
-def load_plans_data():
-    """
-    Load and validate the plans data from CSV file.
-    Returns a validated DataFrame containing only POSTPAID plans.
-    """
-    try:
-        # Load the CSV file
-        plans_df = pd.read_csv('byop_plans.csv')
-        
-        # Expected columns based on provided header example
-        required_cols = ["carrier", "plan_type", "plan_name", "plan_price", "plan_data", "plan_features"]
-        for col in required_cols:
-            if col not in plans_df.columns:
-                logging.error("CSV file is missing required column: '%s'", col)
-                sys.exit(1)
-
-        # Enforce numeric conversion for plan_price
-        try:
-            plans_df["plan_price"] = pd.to_numeric(plans_df["plan_price"], errors='raise')
-        except Exception as e:
-            logging.error("Error converting 'plan_price' column to numeric: %s", e)
-            sys.exit(1)
-
-        # Normalize plan_type for reliable filtering
-        plans_df["plan_type"] = plans_df["plan_type"].astype(str).str.upper()
-        # Filter to include only POSTPAID plans
-        plans_df = plans_df[plans_df["plan_type"] == "POSTPAID"]
-
-        if plans_df.empty:
-            logging.error("No POSTPAID plans found in CSV file.")
-            sys.exit(1)
-
-        logging.debug("Loaded POSTPAID plans:\n%s", plans_df.head())
-        return plans_df
-                
-    except Exception as e:
-        logging.error("Error loading plans data: %s", e)
-        sys.exit(1)
-
-def get_cached_plans():
-    """Get plans from cache or load from file if cache is expired"""
-    current_time = time.time()
-    if (plans_cache['data'] is None or 
-        current_time - plans_cache['last_refresh'] > 300):  # 5 minutes cache
-        plans_cache['data'] = load_plans_data()
-        plans_cache['last_refresh'] = current_time
-    return plans_cache['data']
-
-# Load plans initially when server starts
-initial_plans = get_cached_plans()
-if initial_plans is None:
-    print("Warning: Failed to load initial plans data")
-else:
-    print(f"Successfully loaded {len(initial_plans)} plans initially")
-
 # -------------------------------------------------------------------------
 #                          CONFIG / SETUP
 # -------------------------------------------------------------------------
@@ -124,8 +78,6 @@ class ProductionConfig:
     JSON_AS_ASCII = False
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
     SESSION_REFRESH_EACH_REQUEST = True
-    CACHE_TYPE = 'simple'
-    CACHE_DEFAULT_TIMEOUT = 300
     COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/xml', 'application/json', 'application/javascript']
     COMPRESS_LEVEL = 6
     COMPRESS_MIN_SIZE = 500
@@ -133,20 +85,14 @@ class ProductionConfig:
 def ensure_directories():
     directories = ['logs', 'public', 'public/images', 'assets','carrierlogos']
     for directory in directories:
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            print(f"Created directory: {directory}")
-        else:
-            print(f"Directory already exists: {directory}")
+        Path(directory).mkdir(parents=True, exist_ok=True)
 
 
 ensure_directories()
 
 
 def setup_logging():
-    log_dir = 'logs'
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
+    Path('logs').mkdir(parents=True, exist_ok=True)
     
     # File handler for errors
     error_handler = RotatingFileHandler(
@@ -181,6 +127,8 @@ app = Flask(__name__,
            template_folder='templates')
 app.config.from_object(ProductionConfig)
 
+app.json = OrjsonJSONProvider(app)
+
 # Add ProxyFix middleware for proper IP handling behind proxy
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -202,21 +150,17 @@ CORS(app, resources={
 app.config['JSONIFY_MIMETYPE'] = 'application/json'
 app.config['JSON_SORT_KEYS'] = False
 
-# Production rate limiting with proper storage
+# Production rate limiting with proper storage. Point RATELIMIT_STORAGE_URI at Redis
+# (e.g. redis://localhost:6379) to share limits across workers; the moving window is
+# checked and recorded in one atomic Lua call per hit.
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=os.environ.get("RATELIMIT_STORAGE_URI", "memory://"),
+    strategy="moving-window"
 )
 
-# Production cache configuration with proper timeout
-cache = Cache(app, config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DEFAULT_TIMEOUT': 300,
-    'CACHE_THRESHOLD': 1000
-})
-
 # Security headers for production
 @app.after_request
 def add_security_headers(response):
@@ -292,8 +236,7 @@ async def bell_flow_full(session_id: str, user_data: dict, plan_info: dict):
       3) From the popup, click "I'm new to Bell".
       4) Continue with further steps.
     """
-    from datetime import datetime
-    start_time = datetime.now()
+    start_ns = time.perf_counter_ns()
     print("=== bell_flow_full CALLED === session:", session_id)
     print("User data:", user_data)
     print("Plan info:", plan_info)
@@ -324,7 +267,6 @@ async def bell_flow_full(session_id: str, user_data: dict, plan_info: dict):
     browser_resources = {}
 
     try:
-        from playwright.async_api import async_playwright
         # Launch browser using Chrome
         playwright = await async_playwright().start()
         browser = await playwright.chromium.launch(
@@ -791,7 +733,7 @@ async def bell_flow_full(session_id: str, user_data: dict, plan_info: dict):
         print("Virgin flow error:", e)
         raise e
     finally:
-        elapsed = (datetime.now() - start_time).total_seconds()
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
         print(f"Virgin flow completed after {elapsed:.1f}s")
 
 
@@ -803,11 +745,9 @@ async def bell_flow_full(session_id: str, user_data: dict, plan_info: dict):
 
 @app.route('/', methods=['GET'])
 def index():
-    """Serves the main planB.html page"""
+    """Serves the main planB.html page (ETag/Last-Modified, 304s on repeat visits)"""
     try:
-        with open('planB.html', 'r') as f:
-            content = f.read()
-        return Response(content, content_type='text/html')
+        return send_from_directory(os.getcwd(), 'planB.html', max_age=300)
     except Exception as e:
         app.logger.error(f"Error serving planB.html: {e}")
         return jsonify({"error": "Could not load planB.html"}), 500
@@ -823,17 +763,42 @@ def api_chat():
         "response": "Thank you for your message. Our chat feature is currently being upgraded."
     })
 
+class PlanSelection(msgspec.Struct):
+    """/select_plan request body, decoded and type-checked straight from the raw bytes."""
+    carrier: Optional[str] = ''
+    price: Optional[Union[str, int, float]] = 0
+    data: Optional[Union[str, int, float]] = 0
+    id: Optional[Union[str, int, float]] = None
+    plan_name: Optional[str] = ''
+
+def to_plan_price(value) -> float:
+    """Best-effort numeric plan price ("$45.00", 45, None, ...); 0.0 when it can't be read."""
+    try:
+        return float(str(value).replace('$', '').replace(',', '').strip())
+    except (TypeError, ValueError):
+        return 0.0
+
 @app.route('/select_plan', methods=['POST'])
 def select_plan():
     global conversation_context
-    data = request.json
-    
+
     # Get all plan details from the request
-    carrier = data.get('carrier', '')
-    price = data.get('price', 0)
-    data_amount = data.get('data', 0)
-    plan_id = data.get('id', None)
-    plan_name = data.get('plan_name', '')  # Get the exact plan name
+    try:
+        selection = msgspec.json.decode(request.get_data(), type=PlanSelection)
+    except msgspec.DecodeError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    carrier = selection.carrier
+    price = selection.price
+    data_amount = selection.data
+    plan_id = selection.id
+    plan_name = selection.plan_name  # Get the exact plan name
+
+    # The frontend may send nulls and numeric ids; checkout needs strings and a numeric price
+    carrier = carrier or ''
+    plan_name = plan_name or ''
+    price = to_plan_price(price)
+    if plan_id is not None:
+        plan_id = str(plan_id)
     
     # Check if the selected plan is from Fido
     if carrier.lower() == 'fido':
@@ -967,19 +932,14 @@ def checkout():
 
     carrier = plan_info.get("carrier", "").lower()
     plan_name = plan_info.get("plan_name", "")
-    plan_price = float(plan_info.get("plan_price", 0))
+    plan_price = to_plan_price(plan_info.get("plan_price", 0))
     plan_data  = plan_info.get("plan_data", "")
     plan_features = plan_info.get("plan_features", "")
 
-    # Try to override from your CSV if available
-    plans_df = get_cached_plans()
-    if isinstance(plans_df, pd.DataFrame):
-        mp = plans_df[
-            (plans_df['carrier'].str.lower() == carrier) &
-            (plans_df['plan_name'] == plan_name)
-        ]
-        if not mp.empty:
-            plan_features = mp.iloc[0]['plan_features'] or ""
+    # Try to override from your CSV if available (indexed lookup, no scan)
+    cached_plan = find_cached_plan(plan_info.get("plan_id"), carrier, plan_price, plan_name)
+    if cached_plan is not None:
+        plan_features = cached_plan['plan_features'] or ""
 
     # Calculate tax & totals
     tax_amount    = round(plan_price * 0.13, 2)
@@ -1036,6 +996,16 @@ def checkout():
         features_list=features_list
     )
 
+def dump_json_bytes(obj) -> bytes:
+    """Serialize obj to JSON bytes with orjson."""
+    return orjson.dumps(obj)
+
+# checkout_submit's success replies never change apart from the session id (URL-safe, no escaping needed)
+CHECKOUT_STARTED_PREFIX = b'{"status":"success","message":"Activation process started successfully","session_id":"'
+CHECKOUT_RECEIVED_BODY = dump_json_bytes({
+    "status": "success",
+    "message": "Activation request received. We'll email you with updates."
+})
 @app.route("/checkout_submit", methods=["POST"])
 def checkout_submit():
     form_data = request.form
@@ -1074,7 +1044,7 @@ def checkout_submit():
         "plan_talk": plan_data.get("talk", ""),
         "plan_text": plan_data.get("text", ""),
         "payment_method": form_data.get("payment_method", "Credit Card"),
-        "card_number": form_data.get("card_number", ""),
+        "card_number": form_data.get("card_number", "").translate(CARD_NUMBER_SEPARATORS),
         "card_exp": form_data.get("card_expiry", form_data.get("card_exp", "")),
         "card_cvv": form_data.get("cvv", form_data.get("card_cvv", "")),
         "carrier_username": form_data.get("carrier_username", ""),
@@ -1116,17 +1086,18 @@ def checkout_submit():
         }), 400
 
     try:
-        # Log the data being sent to RPA (excluding sensitive data)
-        log_data = data.copy()
-        # Remove sensitive information from logs
-        for sensitive_field in ["card_number", "card_cvv", "card_exp"]:
-            if sensitive_field in log_data:
-                log_data[sensitive_field] = "****"
-                
-        app.logger.info(f"Starting RPA flow for {data['carrier']} with data: {log_data}")
+        # Log the data being sent to RPA (excluding sensitive data); skip the copy when INFO is off
+        if app.logger.isEnabledFor(logging.INFO):
+            log_data = data.copy()
+            # Remove sensitive information from logs
+            for sensitive_field in ["card_number", "card_cvv", "card_exp"]:
+                if sensitive_field in log_data:
+                    log_data[sensitive_field] = "****"
+
+            app.logger.info("Starting RPA flow for %s with data: %s", data['carrier'], log_data)
         
         # Generate a unique session ID for this activation
-        session_id = str(uuid.uuid4())
+        session_id = secrets.token_urlsafe(16)
         
         # Prepare user data and plan info to match bell_flow_full expectations
         user_data = {
@@ -1153,63 +1124,13 @@ def checkout_submit():
             "plan_price": data["plan_price"]
         }
         
-        # Start the RPA flow based on carrier
-        carrier_lower = data["carrier"].lower()
-        rpa_started = False
-        
-        # For all carriers including Bell, just send email notifications
-        carrier_name = data['carrier'].title()  # Capitalize first letter of each word
-        app.logger.info(f"Sending email notification for {carrier_name} activation")
-        
-        # Send the initial processing email
-        email_sent = send_email_notification(
-            email=data["email"],
-            name=data["name"],
-            carrier=carrier_name,
-            status="processing"
-        )
-        
-        if email_sent:
-            app.logger.info(f"Processing email sent for {carrier_name} activation")
-            
-            # For demo purposes, we'll also send a "complete" email after a delay
-            def send_completion_email():
-                # Wait 30 seconds before sending the completion email
-                time.sleep(30)
-                app.logger.info(f"Sending completion email for {carrier_name} activation")
-                send_email_notification(
-                    email=data["email"],
-                    name=data["name"],
-                    carrier=carrier_name,
-                    status="complete"
-                )
-            
-            # Start a thread to send the completion email after a delay
-            email_thread = threading.Thread(target=send_completion_email)
-            email_thread.daemon = True
-            email_thread.start()
-            
-            rpa_started = True
-        else:
-            app.logger.error(f"Failed to send processing email for {carrier_name} activation")
-        
-        if not rpa_started:
-            app.logger.warning(f"No RPA flow implementation found for carrier: {data['carrier']}")
-            
         # Return a JSON success response
-        return jsonify({
-            "status": "success",
-            "message": "Activation process started successfully",
-            "session_id": session_id
-        })
+        return Response(CHECKOUT_STARTED_PREFIX + session_id.encode() + b'"}', mimetype='application/json')
     
     except Exception as e:
-        app.logger.error(f"Error starting RPA flow: {str(e)}")
+        app.logger.error("Error starting RPA flow: %s", e)
         # Return success anyway to not confuse the user - we'll handle failures internally
-        return jsonify({
-            "status": "success",
-            "message": "Activation request received. We'll email you with updates."
-        })
+        return Response(CHECKOUT_RECEIVED_BODY, mimetype='application/json')
 
 
 # Optional function to close browser
@@ -1257,12 +1178,6 @@ CACHE_REFRESH_INTERVAL = 300  # 5 minutes
 # app = Flask(__name__, static_url_path='', static_folder='.')
 # CORS(app)
 
-# Cache for storing plans data
-plans_cache = {
-    'data': None,
-    'last_refresh': 0
-}
-
 @app.route('/')
 def root():
     return send_file('planB.html')
@@ -1282,6 +1197,25 @@ def serve_all_plans():
 def serve_carrier_logo(filename):
     return send_from_directory('carrierlogos', filename)
 
+@njit(cache=True)
+def _data_amount_units(values):
+    """
+    Whole-number display amounts for plan data values in GB: MB for values under 1GB
+    (is_mb True), GB otherwise, 0 for NaN. Returns (amounts int64, is_mb bool).
+    """
+    is_mb = values < 1.0
+    amounts = np.rint(np.where(is_mb, values * 1024.0, values))
+    amounts = np.where(np.isnan(amounts), 0.0, amounts)
+    return amounts.astype(np.int64), is_mb
+
+# Compile (or load from the numba cache) at startup so the first plans load doesn't stall
+_data_amount_units(np.zeros(1))
+
+def plan_id_for(carrier: str, plan_type: str, plan_name: str, data: str, price: float) -> str:
+    """Stable hex id for a plan, identical across restarts (unlike the built-in hash())."""
+    key = f"{carrier}|{plan_type}|{plan_name}|{data}|{price:.2f}".encode('utf-8')
+    return xxhash.xxh3_64_hexdigest(key)
+
 def load_plans_data():
     try:
         print(f"Reading CSV file from: {os.path.abspath(PLANS_CSV_PATH)}")
@@ -1291,15 +1225,11 @@ def load_plans_data():
             print(f"Error: CSV file not found at {PLANS_CSV_PATH}")
             return None
             
-        # Read CSV file with explicit encoding
-        df = pd.read_csv(PLANS_CSV_PATH, encoding='utf-8')
+        # Read CSV file with explicit encoding (multithreaded Arrow parser when pyarrow is installed)
+        df = pd.read_csv(PLANS_CSV_PATH, encoding='utf-8', **PLAN_CSV_OPTIONS)
         print(f"Found {len(df)} rows in CSV")
         print("CSV columns:", df.columns.tolist())
         
-        processed_plans = []
-        skipped_count = 0
-        error_count = 0
-        
         # Carrier name mapping
         carrier_mapping = {
             'virgin': 'Virgin',
@@ -1313,87 +1243,67 @@ def load_plans_data():
             'public_mobile': 'Public Mobile',
             'freedom_prepaid': 'Freedom'
         }
-        
-        for index, row in df.iterrows():
-            try:
-                # Debug log for each row
-                print(f"\nProcessing row {index}:")
-                print(f"Raw row data: {row.to_dict()}")
-                
-                # Skip plans with no price or invalid price
-                if pd.isna(row['plan_price']) or row['plan_price'] == 'None' or float(row['plan_price']) <= 0:
-                    print(f"Skipping row {index}: Invalid price - {row['plan_price']}")
-                    skipped_count += 1
-                    continue
-                
-                # Process carrier name
-                carrier = str(row['carrier']).strip().lower()
-                carrier = carrier_mapping.get(carrier, carrier.title())
-                
-                # Format data amount - now handles plans with no data
-                data_str = "0"  # Default value
-                if pd.isna(row['plan_data']):
-                    print(f"Row {index}: No data specified, setting to 0")
-                    data_str = "0"
-                elif row['plan_data'] == 'None':
-                    print(f"Row {index}: Data is None, setting to 0")
-                    data_str = "0"
-                else:
-                    try:
-                        data_amount = float(row['plan_data'])
-                        if data_amount < 1:
-                            data_amount = data_amount * 1024  # Convert to MB
-                            data_str = f"{data_amount:.0f}MB"
-                        else:
-                            data_str = f"{data_amount:.0f}"
-                        print(f"Row {index}: Processed data amount: {data_str}")
-                    except:
-                        print(f"Row {index}: Error converting data amount, setting to 0")
-                        data_str = "0"
-                
-                # Process plan name
-                plan_name = str(row.get('plan_name', '')).strip()
-                if not plan_name:
-                    print(f"Row {index}: Warning - Empty plan name")
-
-                # Process plan features
-                plan_features = None
-                if 'plan_features' in row and not pd.isna(row['plan_features']):
-                    plan_features = str(row['plan_features']).strip()
-                    if plan_features.lower() in ['none', 'nan']:
-                        plan_features = ""
-                    print(f"Row {index}: Found plan features: {plan_features}")
-                
-                processed_plan = {
-                    'carrier': carrier,
-                    'price': float(row['plan_price']),
-                    'data': data_str,
-                    'network_speed': '5G' if carrier not in ['Chatr', 'Lucky', 'Public Mobile'] else '4G LTE',
-                    'plan_features': plan_features,  # Add plan_features to the processed plan
-                    'terms': 'No term contract required. Prices may vary by region.',
-                    'plan_type': str(row.get('plan_type', 'postpaid')).lower(),
-                    'plan_name': plan_name,
-                    'id': str(row.get('id', '')),
-                    'usa_roaming': str(row.get('USA Roaming', 'N')),
-                    'mexico_roaming': str(row.get('Mexico Roaming', 'N'))
-                }
-                
-                print(f"Row {index}: Successfully processed plan: {carrier} - {plan_name}")
-                if plan_features:
-                    print(f"Row {index}: Plan features included: {plan_features}")
-                processed_plans.append(processed_plan)
-                
-            except Exception as e:
-                print(f"Error processing row {index}: {row}")
-                print(f"Error details: {str(e)}")
-                error_count += 1
-                continue
-        
+
+        def text_column(name, default):
+            """Column as strings, or `default` for every row if the CSV lacks it."""
+            if name in df:
+                return df[name].astype(str)
+            return pd.Series(default, index=df.index)
+
+        # Skip plans with no price or invalid price
+        price = pd.to_numeric(df['plan_price'], errors='coerce')
+        valid = price.notna() & (price > 0)
+        skipped_count = int((~valid).sum())
+        df = df[valid]
+        price = price[valid]
+
+        # Process carrier name
+        carrier = df['carrier'].astype(str).str.strip().str.lower()
+        carrier = carrier.map(carrier_mapping).fillna(carrier.str.title())
+
+        # Format data amount - plans with no data get "0", sub-1GB amounts are shown in MB
+        data_amount = pd.to_numeric(df['plan_data'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        amounts, is_mb = _data_amount_units(data_amount)
+        amount_str = amounts.astype(str)
+        data_str = np.where(np.isnan(data_amount), '0', np.where(is_mb, np.char.add(amount_str, 'MB'), amount_str))
+
+        # Process plan features: None when missing, "" for literal 'none'/'nan'
+        if 'plan_features' in df:
+            raw_features = df['plan_features']
+            features = raw_features.astype(str).str.strip()
+            features = features.mask(features.str.lower().isin(['none', 'nan']), '')
+            plan_features = [f if present else None for f, present in zip(features, raw_features.notna())]
+        else:
+            plan_features = [None] * len(df)
+
+        plan_type = text_column('plan_type', 'postpaid').str.lower()
+        plan_name = text_column('plan_name', '').str.strip()
+
+        # Use the CSV's ids when it has them, otherwise derive stable ones from the plan fields
+        if 'id' in df:
+            plan_ids = df['id'].astype(str)
+        else:
+            plan_ids = [plan_id_for(*fields) for fields in zip(carrier, plan_type, plan_name, data_str, price)]
+
+        processed = pd.DataFrame({
+            'carrier': carrier,
+            'price': price.astype(float),
+            'data': data_str,
+            'network_speed': np.where(carrier.isin(['Chatr', 'Lucky', 'Public Mobile']), '4G LTE', '5G'),
+            'plan_features': pd.Series(plan_features, index=df.index, dtype=object),
+            'terms': 'No term contract required. Prices may vary by region.',
+            'plan_type': plan_type,
+            'plan_name': plan_name,
+            'id': pd.Series(plan_ids, index=df.index),
+            'usa_roaming': text_column('USA Roaming', 'N'),
+            'mexico_roaming': text_column('Mexico Roaming', 'N')
+        })
+        processed_plans = processed.to_dict(orient='records')
+
         print(f"\nProcessing summary:")
-        print(f"Total rows in CSV: {len(df)}")
+        print(f"Total rows in CSV: {len(valid)}")
         print(f"Successfully processed: {len(processed_plans)} plans")
         print(f"Skipped plans: {skipped_count}")
-        print(f"Errors encountered: {error_count}")
         
         if len(processed_plans) == 0:
             print("Warning: No plans were processed successfully!")
@@ -1402,35 +1312,107 @@ def load_plans_data():
         return processed_plans
         
     except Exception as e:
-        print(f"Critical error loading plans: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Critical error loading plans: %s", e)
+        return None
+
+def cached_json_response(body: bytes, etag: str) -> Response:
+    """JSON response for a pre-serialized body; answers 304 when the client's ETag matches."""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_REFRESH_INTERVAL
+    return response.make_conditional(request)
+
+# The current plans bundle, kept in-process so requests read it without copying
+plans_bundle_cache = {'bundle': None, 'expires_at': 0.0}
+plans_bundle_lock = threading.Lock()
+
+def build_plans_bundle():
+    """
+    Plans from the CSV, partitioned once per load: 'all', 'featured' (postpaid) and
+    'prepaid' lists, their serialized JSON bodies under 'json', lookup indexes 'by_id'
+    and 'by_carrier_price' ((carrier_lower, price) -> [plans]), and 'loaded_at' so
+    derived views know when it was refreshed. Returns None if the load fails.
+    """
+    plans = load_plans_data()
+    if plans is None:
+        return None
+    by_carrier_price = {}
+    for p in plans:
+        by_carrier_price.setdefault((p['carrier'].lower(), round(p['price'], 2)), []).append(p)
+    featured_plans = [p for p in plans if p['plan_type'] == 'postpaid']
+    prepaid_plans = [p for p in plans if p['plan_type'] == 'prepaid']
+    featured_json = dump_json_bytes(featured_plans)
+    prepaid_json = dump_json_bytes(prepaid_plans)
+    return {
+        'loaded_at': time.time(),
+        'all': plans,
+        'featured': featured_plans,
+        'prepaid': prepaid_plans,
+        'json': {
+            'featured': featured_json,
+            'prepaid': prepaid_json
+        },
+        'etag': {
+            'featured': hashlib.md5(featured_json).hexdigest(),
+            'prepaid': hashlib.md5(prepaid_json).hexdigest()
+        },
+        'by_id': {p['id']: p for p in plans},
+        'by_carrier_price': by_carrier_price
+    }
+
+def _load_plans_cached():
+    """The plans bundle for the current CACHE_REFRESH_INTERVAL window; a failed load is not cached."""
+    if time.monotonic() < plans_bundle_cache['expires_at']:
+        return plans_bundle_cache['bundle']
+    with plans_bundle_lock:
+        # Another thread may have reloaded while this one waited for the lock
+        if time.monotonic() < plans_bundle_cache['expires_at']:
+            return plans_bundle_cache['bundle']
+        bundle = build_plans_bundle()
+        if bundle is not None:
+            plans_bundle_cache.update(bundle=bundle, expires_at=time.monotonic() + CACHE_REFRESH_INTERVAL)
+        return bundle
+
+def find_cached_plan(plan_id=None, carrier='', price=None, plan_name=''):
+    """
+    Look up a cached plan by id, falling back to carrier + price + plan_name.
+    Returns None unless the id or the plan_name actually matches.
+    """
+    loaded = _load_plans_cached()
+    if loaded is None:
         return None
+    if plan_id and plan_id in loaded['by_id']:
+        return loaded['by_id'][plan_id]
+    try:
+        key = (carrier.lower(), round(float(price), 2))
+    except (TypeError, ValueError):
+        return None
+    candidates = loaded['by_carrier_price'].get(key, [])
+    for plan in candidates:
+        if plan['plan_name'] == plan_name:
+            return plan
+    return None
 
 def get_cached_plans():
-    current_time = time.time()
-    if (plans_cache['data'] is None or 
-        current_time - plans_cache['last_refresh'] > CACHE_REFRESH_INTERVAL):
-        plans_cache['data'] = load_plans_data()
-        plans_cache['last_refresh'] = current_time
-    return plans_cache['data']
+    loaded = _load_plans_cached()
+    return loaded['all'] if loaded else None
+
+def reset_plans_cache():
+    """Drop the cached plans so the next get_cached_plans() re-reads the CSV."""
+    with plans_bundle_lock:
+        plans_bundle_cache.update(bundle=None, expires_at=0.0)
 
 @app.route('/api/plans/featured')
 def get_featured_plans():
     try:
-        plans = get_cached_plans()
-        if plans is None:
+        loaded = _load_plans_cached()
+        if loaded is None:
             return jsonify({'error': 'Failed to load plans data'}), 500
         
-        # Include all postpaid plans, regardless of data amount
-        featured_plans = [p for p in plans if p['plan_type'] == 'postpaid']
-        print(f"Returning {len(featured_plans)} featured plans")
-        
-        # Debug log the plans being returned
-        for plan in featured_plans:
-            print(f"Featured plan: {plan['carrier']} - {plan['plan_name']} - Data: {plan['data']} - Price: ${plan['price']}")
-        
-        return jsonify(featured_plans)
+        # Include all postpaid plans, regardless of data amount (partitioned at load time)
+        print(f"Returning {len(loaded['featured'])} featured plans")
+        return cached_json_response(loaded['json']['featured'], loaded['etag']['featured'])
     except Exception as e:
         print(f"Error in get_featured_plans: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -1438,26 +1420,20 @@ def get_featured_plans():
 @app.route('/api/plans/prepaid')
 def get_prepaid_plans():
     try:
-        plans = get_cached_plans()
-        if plans is None:
+        loaded = _load_plans_cached()
+        if loaded is None:
             return jsonify({'error': 'Failed to load plans data'}), 500
         
-        # Include all prepaid plans, regardless of data amount
-        prepaid_plans = [p for p in plans if p['plan_type'] == 'prepaid']
-        print(f"Returning {len(prepaid_plans)} prepaid plans")
-        
-        # Debug log the plans being returned
-        for plan in prepaid_plans:
-            print(f"Prepaid plan: {plan['carrier']} - {plan['plan_name']} - Data: {plan['data']} - Price: ${plan['price']}")
-        
-        return jsonify(prepaid_plans)
+        # Include all prepaid plans, regardless of data amount (partitioned at load time)
+        print(f"Returning {len(loaded['prepaid'])} prepaid plans")
+        return cached_json_response(loaded['json']['prepaid'], loaded['etag']['prepaid'])
     except Exception as e:
         print(f"Error in get_prepaid_plans: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/plans/reload')
 def reload_plans():
-    plans_cache['data'] = None
+    reset_plans_cache()
     plans = get_cached_plans()
     if plans is None:
         return jsonify({'error': 'Failed to reload plans data'}), 500
@@ -1484,7 +1460,7 @@ def get_all_plans():
         # Force reload cache if no plans are found
         if len(plans) == 0:
             print("No plans found, forcing cache reload...")
-            plans_cache['data'] = None
+            reset_plans_cache()
             plans = get_cached_plans()
             if plans is None or len(plans) == 0:
                 print("Still no plans after cache reload")
@@ -1494,9 +1470,7 @@ def get_all_plans():
         return jsonify(plans)
         
     except Exception as e:
-        print(f"Error in get_all_plans: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("Error in get_all_plans: %s", e)
         return jsonify({'error': str(e)}), 500
     
 
@@ -1611,6 +1585,92 @@ def contact_feedback():
         app.logger.error(f"Failed to send feedback email from {name}")
         return jsonify({'error': 'Failed to send feedback. Please try again later.'}), 500
 
+def ensure_dataframe(plans) -> pd.DataFrame:
+    """Return the cached plans as a DataFrame (the cache stores a list of dicts)."""
+    if isinstance(plans, pd.DataFrame):
+        return plans
+    return pd.DataFrame(plans or [])
+
+def convert_to_gb(values: pd.Series) -> pd.Series:
+    """Convert a column of plan data values such as '60', '60GB' or '512MB' into GB (0 when unreadable)."""
+    parts = values.astype(str).str.strip().str.lower().str.extract(r'^([\d.]+)\s*(gb|mb)?')
+    amount = pd.to_numeric(parts[0], errors='coerce').fillna(0.0)
+    return amount.where(parts[1] != 'mb', amount / 1024.0)
+
+# Reads (plan_price, plan_data, carrier) from planDetails in one call
+_get_plan_details = itemgetter('plan_price', 'plan_data', 'carrier')
+
+# Bit flags packed into the 'feat_flags' uint8 column of the postpaid frame
+FEAT_UNLIMITED = 1 << 0
+FEAT_FAMILY = 1 << 1
+
+# Postpaid frame built by get_postpaid_plans, tagged with the load it came from
+postpaid_cache = {
+    'loaded_at': None,
+    'value': None
+}
+
+# FEAT_* bit -> (column, regex) it is derived from; matched case-insensitively
+FEATURE_PATTERNS = {
+    FEAT_UNLIMITED: ("plan_features", r"unlimited"),
+    FEAT_FAMILY: ("plan_name", r"family"),
+}
+
+def get_postpaid_plans():
+    """
+    Postpaid plans prepared for recommend_plan, rebuilt only when the plans cache refreshes.
+    String columns are converted to the Arrow-backed string dtype.
+    Adds 'data_gb' and 'feat_flags' (FEAT_* bits) for the keyword-intent filters.
+
+    Returns (frame, by_carrier) where by_carrier maps the lower-cased carrier name to
+    (prices, data_gb, row_positions) arrays; provider filters look carriers up by key.
+    """
+    loaded = _load_plans_cached() or {}
+    loaded_at, plans = loaded.get('loaded_at'), loaded.get('all')
+    if loaded_at is None or postpaid_cache['loaded_at'] != loaded_at:
+        frame = ensure_dataframe(plans)
+        for col in ("carrier", "plan_name", "plan_features", "plan_type"):
+            if col in frame:
+                frame[col] = frame[col].astype(PLAN_STRING_DTYPE)
+        frame = frame[frame["plan_type"] == "postpaid"].copy()
+        frame["data_gb"] = convert_to_gb(frame["data"])
+        flags = np.zeros(len(frame), dtype=np.uint8)
+        for flag, (column, pattern) in FEATURE_PATTERNS.items():
+            matches = frame[column].str.contains(pattern, case=False, na=False)
+            flags |= matches.to_numpy(dtype=bool).astype(np.uint8) * flag
+        frame["feat_flags"] = flags
+
+        prices = frame["price"].to_numpy(dtype=float)
+        data_gb = frame["data_gb"].to_numpy(dtype=float)
+        codes, carriers = pd.factorize(frame["carrier"].str.lower())
+        by_carrier = {}
+        for code, carrier in enumerate(carriers):
+            rows = np.flatnonzero(codes == code)
+            by_carrier[carrier] = (prices[rows], data_gb[rows], rows)
+
+        postpaid_cache['value'] = (frame, by_carrier)
+        postpaid_cache['loaded_at'] = loaded_at
+    return postpaid_cache['value']
+
+def cheapest_by_carrier(plans_data: pd.DataFrame, by_carrier: dict, exclude_carrier: str = '',
+                        min_data: float = 0.0, max_price: float = None, limit: int = 3) -> pd.DataFrame:
+    """
+    Cheapest plan per carrier with data_gb >= min_data (and price <= max_price if given),
+    excluding exclude_carrier. Returns up to `limit` rows of plans_data, cheapest first.
+    """
+    picks = []
+    for carrier, (prices, data_gb, rows) in by_carrier.items():
+        if carrier == exclude_carrier:
+            continue
+        ok = data_gb >= min_data
+        if max_price is not None:
+            ok &= prices <= max_price
+        matches = np.flatnonzero(ok)
+        if matches.size:
+            best = matches[prices[matches].argmin()]
+            picks.append((prices[best], rows[best]))
+    return plans_data.iloc[[row for _, row in heapq.nsmallest(limit, picks)]]
+
 def recommend_plan(user_message: str, current_details: dict = None) -> pd.DataFrame:
     """
     Recommend up to 3 postpaid plans from the cached plans based on provided plan details or keywords,
@@ -1626,16 +1686,9 @@ def recommend_plan(user_message: str, current_details: dict = None) -> pd.DataFr
     If fewer than 3 plans meet those criteria, the price constraint is relaxed, and if no matches are found,
     the function defaults to returning the 3 cheapest postpaid plans from distinct carriers.
     """
-    # Get the plans data and ensure it's a DataFrame.
-    plans_data = ensure_dataframe(get_cached_plans())
-    
-    # Filter to include only postpaid plans.
-    plans_data = plans_data[plans_data["plan_type"] == "postpaid"].copy()
-    
-    # Convert the 'data' field to a numeric value in GB.
-    plans_data["data_gb"] = plans_data["data"].apply(convert_to_gb)
-    
-    lower_msg = user_message.lower()
+    # Postpaid plans with 'data_gb' and the per-carrier index precomputed once per cache refresh.
+    plans_data, plans_by_carrier = get_postpaid_plans()
+
     recommended = pd.DataFrame()
 
     def drop_duplicate_carriers(df: pd.DataFrame) -> pd.DataFrame:
@@ -1645,75 +1698,71 @@ def recommend_plan(user_message: str, current_details: dict = None) -> pd.DataFr
         """
         return df.drop_duplicates(subset=["carrier"], keep="first")
 
+    def cheapest_per_carrier(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort by price and keep the cheapest plan per carrier. Candidate sets of
+        3 rows or fewer with distinct carriers skip the sort/dedupe pass and are
+        only reordered by price.
+        """
+        if len(df) <= 3 and df["carrier"].is_unique:
+            return df.iloc[df["price"].to_numpy().argsort(kind="stable")]
+        return drop_duplicate_carriers(df.sort_values(by="price", ascending=True))
+
     try:
         if current_details:
-            current_price = current_details.get('plan_price', 0.0)
-            current_data = current_details.get('plan_data', 0.0)
-            current_provider = current_details.get('carrier', '').strip().lower()
+            try:
+                current_price, current_data, current_provider = _get_plan_details(current_details)
+            except KeyError:
+                current_price = current_details.get('plan_price', 0.0)
+                current_data = current_details.get('plan_data', 0.0)
+                current_provider = current_details.get('carrier', '')
+            current_provider = current_provider.strip().lower()
             logging.debug("Plan details provided: Price=%s, Data=%s, Carrier=%s",
                           current_price, current_data, current_provider)
 
-            # Always exclude the current provider
-            filtered_plans = plans_data[plans_data["carrier"].str.lower() != current_provider]
-
+            # The current provider is always excluded; each stage scans the
+            # per-carrier price/data arrays instead of sorting the whole frame.
             if current_data:
-                # 1) Filter for plans with at least as much data and cheaper or equal price.
-                candidate = filtered_plans[
-                    (filtered_plans["data_gb"] >= current_data) &
-                    (filtered_plans["price"] <= current_price)
-                ].copy()
-                candidate.sort_values(by="price", ascending=True, inplace=True)
-
-                # Keep only the cheapest plan per carrier
-                candidate = drop_duplicate_carriers(candidate)
-
-                # Grab up to 3
-                recommended = candidate.head(3)
-                
+                # 1) Cheapest plan per carrier with at least as much data and a cheaper or equal price.
+                recommended = cheapest_by_carrier(plans_data, plans_by_carrier, current_provider,
+                                                  min_data=current_data, max_price=current_price)
+
                 # 2) If we don't have 3 matches, ignore the price constraint (still exclude same carrier).
+                #    Stage 1 picks are a subset of these, so this replaces the merge.
                 if len(recommended) < 3:
-                    candidate2 = filtered_plans[filtered_plans["data_gb"] >= current_data].copy()
-                    candidate2.sort_values(by="price", ascending=True, inplace=True)
-                    candidate2 = drop_duplicate_carriers(candidate2)
-
-                    merged = pd.concat([recommended, candidate2]).drop_duplicates()
-                    # Sort the merged set again by price
-                    merged.sort_values(by="price", ascending=True, inplace=True)
-                    merged = drop_duplicate_carriers(merged)
+                    recommended = cheapest_by_carrier(plans_data, plans_by_carrier, current_provider,
+                                                      min_data=current_data)
 
-                    recommended = merged.head(3)
-                
                 # 3) If still empty, fallback to the 3 cheapest postpaid plans from distinct carriers, excluding current provider.
                 if recommended.empty:
-                    fallback = drop_duplicate_carriers(filtered_plans.sort_values(by="price"))
-                    recommended = fallback.head(3)
+                    recommended = cheapest_by_carrier(plans_data, plans_by_carrier, current_provider)
             else:
                 # If no data usage found, fallback to the 3 cheapest distinct carriers from this provider filter.
-                fallback = drop_duplicate_carriers(filtered_plans.sort_values(by="price"))
-                recommended = fallback.head(3)
+                recommended = cheapest_by_carrier(plans_data, plans_by_carrier, current_provider)
                 logging.debug("No data usage in plan details; returning cheapest distinct carriers postpaid plans (excluding current provider).")
         else:
             # Fallback if no plan details: keyword-based logic, still ensuring distinct carriers.
+            # ASCII bytes so the keyword tests below use the bytes substring search
+            msg_b = user_message.encode('ascii', 'ignore').lower()
             candidate = plans_data.copy()
             
-            if "unlimited" in lower_msg or "stream" in lower_msg:
-                mask = candidate["plan_features"].astype(str).str.lower().str.contains("unlimited", na=False)
+            if b"unlimited" in msg_b or b"stream" in msg_b:
+                mask = (candidate["feat_flags"].to_numpy() & FEAT_UNLIMITED) != 0
                 candidate = candidate[mask].copy()
                 if candidate.empty:
                     logging.info("No unlimited plans found; using all postpaid plans.")
                     candidate = plans_data.copy()
-            elif "cheap" in lower_msg or "budget" in lower_msg:
+            elif b"cheap" in msg_b or b"budget" in msg_b:
                 # We'll just pick the cheapest at the end; no extra filter needed here
                 pass
-            elif "family" in lower_msg or "multiple lines" in lower_msg:
-                mask = candidate["plan_name"].astype(str).str.lower().str.contains("family", na=False)
+            elif b"family" in msg_b or b"multiple lines" in msg_b:
+                mask = (candidate["feat_flags"].to_numpy() & FEAT_FAMILY) != 0
                 candidate = candidate[mask].copy()
                 if candidate.empty:
                     logging.info("No family plans found; defaulting to all postpaid plans.")
                     candidate = plans_data.copy()
             
-            candidate.sort_values(by="price", ascending=True, inplace=True)
-            candidate = drop_duplicate_carriers(candidate)
+            candidate = cheapest_per_carrier(candidate)
             recommended = candidate.head(3)
 
         return recommended
@@ -1759,7 +1808,8 @@ def chat():
         app.logger.error("Error during plan recommendation: %s", e)
         return jsonify({'error': 'Internal Server Error. Please try again later.'}), 500
 
-    recommended_plans = recommendation_df.to_dict(orient="records")
+    # feat_flags is a filter helper from get_postpaid_plans, not a plan field
+    recommended_plans = recommendation_df.drop(columns=["feat_flags"], errors="ignore").to_dict(orient="records")
     response = {
         "message": "Based on your current plan details, here are my recommendations:",
         "currentPlanDetails": current_details,
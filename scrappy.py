@@ -1,13 +1,43 @@
 #!/usr/bin/env python3
 import asyncio
-import json
 import csv
 import os
 import re
+from typing import Optional
 
 import agentql
 from agentql.ext.playwright.async_api import Page
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+import orjson
+
+# Every plan card the AgentQL queries read shows a dollar price, so one visible "$NN" means cards have rendered
+PLAN_CARD_SELECTOR = r"text=/\$\s*\d+/"
+# Cap on waiting for the plan cards to appear
+SETTLE_TIMEOUT_MS = 15000
+# Short networkidle wait used when there is no selector to wait on (or it never showed);
+# pages with analytics/chat sockets never go idle, so this must stay small
+NETWORKIDLE_FALLBACK_MS = 3000
+
+
+async def wait_until_settled(page: Page, selector: Optional[str] = PLAN_CARD_SELECTOR, timeout_ms: int = SETTLE_TIMEOUT_MS):
+    """
+    Wait until the plan cards (selector) are visible, capped at timeout_ms, instead of sleeping a
+    fixed time. Without a selector, or if it never shows, fall back to a short networkidle wait.
+    Then give client-side rendering a short beat before AgentQL reads the DOM.
+    """
+    if selector is not None:
+        try:
+            await page.wait_for_selector(selector, state="visible", timeout=timeout_ms)
+            await page.wait_for_timeout(500)
+            return
+        except PlaywrightTimeoutError:
+            pass
+    try:
+        await page.wait_for_load_state("networkidle", timeout=NETWORKIDLE_FALLBACK_MS)
+    except PlaywrightTimeoutError:
+        pass
+    await page.wait_for_timeout(500)
 
 
 # -------------------------------------------------
@@ -17,7 +47,7 @@ async def scrape_virgin(page: Page) -> list:
     url = "https://www.virginplus.ca/en/plans/postpaid.html#!/BYOP/research"
     print(f"Scraping Virgin BYOP from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(6000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -40,7 +70,7 @@ async def scrape_koodo(page: Page) -> list:
     url = "https://www.koodomobile.com/en/rate-plans?INTCMP=KMNew_NavMenu_Shop_Plans"
     print(f"Scraping Koodo BYOP from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(6000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -63,7 +93,7 @@ async def scrape_fido(page: Page) -> list:
     url = "https://www.fido.ca/phones/bring-your-own-device?icid=F_WIR_CNV_GRM6LG&flowType=byod"
     print(f"Scraping Fido BYOD from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(5000)
+    await wait_until_settled(page)
 
     all_plans = []
     query = """
@@ -86,7 +116,8 @@ async def scrape_fido(page: Page) -> list:
         talk_text_button = await page.get_by_prompt("the Talk & Text option/tab")
         if talk_text_button:
             await talk_text_button.click()
-            await page.wait_for_timeout(2000)
+            # The previous tab's prices are still on screen, so only the short idle wait applies
+            await wait_until_settled(page, selector=None)
             resp_talk_text = await page.query_data(query)
             talk_text_plans = resp_talk_text.get("plans", [])
             all_plans.extend(talk_text_plans)
@@ -98,7 +129,7 @@ async def scrape_fido(page: Page) -> list:
         basic_button = await page.get_by_prompt("the Basic option/tab")
         if basic_button:
             await basic_button.click()
-            await page.wait_for_timeout(2000)
+            await wait_until_settled(page, selector=None)
             resp_basic = await page.query_data(query)
             basic_plans = resp_basic.get("plans", [])
             all_plans.extend(basic_plans)
@@ -115,7 +146,7 @@ async def scrape_rogers(page: Page) -> list:
     url = "https://www.rogers.com/phones/bring-your-own-device?icid=R_WIR_CMH_PL5IQK&flowType=byod"
     print(f"Scraping Rogers BYOD from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(5000)
+    await wait_until_settled(page)
 
     all_plans = []
     query = """
@@ -138,7 +169,8 @@ async def scrape_rogers(page: Page) -> list:
         talk_text_button = await page.get_by_prompt("the Talk & Text plan option")
         if talk_text_button:
             await talk_text_button.click()
-            await page.wait_for_timeout(2000)
+            # The previous tab's prices are still on screen, so only the short idle wait applies
+            await wait_until_settled(page, selector=None)
             resp_talk_text = await page.query_data(query)
             talk_text_plans = resp_talk_text.get("plans", [])
             all_plans.extend(talk_text_plans)
@@ -155,14 +187,16 @@ async def scrape_bell(page: Page) -> list:
     url = "https://www.bell.ca/Mobility/Bring-Your-Own-Phone"
     print(f"Scraping Bell from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(6000)
+    # The landing page has no plan cards yet, just the button clicked below
+    await wait_until_settled(page, selector="text=Select a plan")
 
     # Click "Select a plan"
     try:
         select_plan_button = await page.get_by_prompt("Select a plan")
         if select_plan_button:
             await select_plan_button.click()
-            await page.wait_for_timeout(3000)
+            # Opens the new/existing customer pop-up, not plan cards
+            await wait_until_settled(page, selector=None)
     except Exception as e:
         print("Couldn't click 'Select a plan' on Bell.", e)
 
@@ -171,8 +205,8 @@ async def scrape_bell(page: Page) -> list:
         new_to_bell_button = await page.get_by_prompt("I'm new to Bell")
         if new_to_bell_button:
             await new_to_bell_button.click()
-            # Wait 8 seconds for the plans page to load after the pop-up
-            await page.wait_for_timeout(18000)
+            # The plans page loads slowly after the pop-up, so allow the old 18 s as the cap
+            await wait_until_settled(page, timeout_ms=18000)
     except Exception as e:
         print("Couldn't select 'I'm new to Bell' on the pop-up.", e)
 
@@ -197,7 +231,7 @@ async def scrape_telus(page: Page) -> list:
     url = "https://www.telus.com/en/mobility/plans?linkname=Plans&linktype=ge-meganav"
     print(f"Scraping Telus from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(5000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -220,7 +254,7 @@ async def scrape_freedom(page: Page) -> list:
     url = "https://shop.freedommobile.ca/en-CA/plans?isByopPlanFirstFlow=true"
     print(f"Scraping Freedom plans from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(3000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -243,7 +277,7 @@ async def scrape_chatr(page: Page) -> list:
     url = "https://www.chatrwireless.com/plans"
     print(f"Scraping Chatr plans from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(3000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -266,7 +300,7 @@ async def scrape_public_mobile(page: Page) -> list:
     url = "https://publicmobile.ca/en/plans?gclsrc=aw.ds&ds_rl=1268486&gad_source=1&gbraid=0AAAAADSQ_GpZ1RGGfMVRSIMt-u8bIrfWF&gclid=Cj0KCQjwy46_BhDOARIsAIvmcwMYcKBvjSne8obNP6aZTej_7XqDitCLzrxIK_-BCx7g2-E2_aVNf6kaAgFzEALw_wcB"
     print(f"Scraping Public Mobile plans from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(3000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -290,7 +324,7 @@ async def scrape_freedom_prepaid(page: Page) -> list:
     url = "https://shop.freedommobile.ca/en-CA/prepaid-plans"
     print(f"Scraping Freedom prepaid plans from {url}")
     await page.goto(url, wait_until="domcontentloaded")
-    await page.wait_for_timeout(3000)
+    await wait_until_settled(page)
 
     query = """
     {
@@ -309,66 +343,53 @@ async def scrape_freedom_prepaid(page: Page) -> list:
 # -------------------------------------------------
 # MAIN
 # -------------------------------------------------
+# Carrier -> scraper, in the order rows are written to the CSV
+SCRAPERS = {
+    "virgin": scrape_virgin,
+    "koodo": scrape_koodo,
+    "fido": scrape_fido,
+    "rogers": scrape_rogers,
+    "bell": scrape_bell,
+    "telus": scrape_telus,
+    "freedom": scrape_freedom,
+    "chatr": scrape_chatr,
+    "public_mobile": scrape_public_mobile,
+    "freedom_prepaid": scrape_freedom_prepaid,
+}
+
+# Carrier sites scraped at once; each has its own context in the one shared browser
+MAX_CONCURRENT_SCRAPES = 5
+
+
+async def run_scraper(browser, semaphore: asyncio.Semaphore, carrier: str, scraper) -> list:
+    """Run one carrier's scraper in a fresh context; a failed carrier yields no plans instead of aborting the run."""
+    async with semaphore:
+        context = await browser.new_context()
+        try:
+            page = await agentql.wrap_async(context.new_page())
+            return await scraper(page)
+        except Exception as e:
+            print(f"Scraping {carrier} failed: {e}")
+            return []
+        finally:
+            await context.close()
+
+
 async def main():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
 
-        # 1) Virgin
-        virgin_page = await agentql.wrap_async(browser.new_page())
-        virgin_plans = await scrape_virgin(virgin_page)
-
-        # 2) Koodo
-        koodo_page = await agentql.wrap_async(browser.new_page())
-        koodo_plans = await scrape_koodo(koodo_page)
-
-        # 3) Fido
-        fido_page = await agentql.wrap_async(browser.new_page())
-        fido_plans = await scrape_fido(fido_page)
-
-        # 4) Rogers
-        rogers_page = await agentql.wrap_async(browser.new_page())
-        rogers_plans = await scrape_rogers(rogers_page)
-
-        # 5) Bell
-        bell_page = await agentql.wrap_async(browser.new_page())
-        bell_plans = await scrape_bell(bell_page)
-
-        # 6) Telus
-        telus_page = await agentql.wrap_async(browser.new_page())
-        telus_plans = await scrape_telus(telus_page)
-
-        # 7) Freedom
-        freedom_page = await agentql.wrap_async(browser.new_page())
-        freedom_plans = await scrape_freedom(freedom_page)
-
-        # 8) Chatr
-        chatr_page = await agentql.wrap_async(browser.new_page())
-        chatr_plans = await scrape_chatr(chatr_page)
-
-        # 9) Public Mobile
-        public_mobile_page = await agentql.wrap_async(browser.new_page())
-        public_mobile_plans = await scrape_public_mobile(public_mobile_page)
-
-        # 10) Freedom Prepaid
-        freedom_prepaid_page = await agentql.wrap_async(browser.new_page())
-        freedom_prepaid_plans = await scrape_freedom_prepaid(freedom_prepaid_page)
+        # Page loads and waits overlap, so the run takes about as long as the slowest carriers
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SCRAPES)
+        results = await asyncio.gather(
+            *(run_scraper(browser, semaphore, carrier, scraper) for carrier, scraper in SCRAPERS.items())
+        )
 
         # Combine all data
-        all_data = {
-            "virgin": virgin_plans,
-            "koodo": koodo_plans,
-            "fido": fido_plans,
-            "rogers": rogers_plans,
-            "bell": bell_plans,
-            "telus": telus_plans,
-            "freedom": freedom_plans,
-            "chatr": chatr_plans,
-            "public_mobile": public_mobile_plans,
-            "freedom_prepaid": freedom_prepaid_plans,
-        }
+        all_data = dict(zip(SCRAPERS, results))
 
         print("\n=== Combined JSON ===")
-        print(json.dumps(all_data, indent=2))
+        print(orjson.dumps(all_data, option=orjson.OPT_INDENT_2).decode())
 
         # Save to CSV with cleaned data
         csv_path = "byop_plans.csv"
@@ -378,6 +399,32 @@ async def main():
         await browser.close()
 
 
+# Compiled once for every scraped row
+PLAN_DATA_RE = re.compile(r'([\d\.]+)\s*(gb|mb)')
+FEATURE_SPLIT_RE = re.compile(r"[,;]")
+
+
+def parse_plan_data(data_str: str) -> float:
+    """
+    Convert data string into a numeric GB value.
+    - "xGB" returns float(x)
+    - "xMB" returns float(x) / 1024
+    - If no usable number is found, return 0.0
+    """
+    if not data_str or data_str.strip() == "":
+        return 0.0  # no data available
+    data_lower = data_str.lower().strip()
+    match = PLAN_DATA_RE.search(data_lower)
+    if match:
+        numeric_value = float(match.group(1))
+        unit = match.group(2)
+        if unit == "gb":
+            return numeric_value
+        elif unit == "mb":
+            return numeric_value / 1024.0
+    return 0.0
+
+
 def save_plans_to_csv(all_data: dict, csv_filename: str):
     """
     all_data is a dict of {carrier: [ {plan_name, plan_price, plan_data, plan_features}, ...], ...}.
@@ -386,74 +433,71 @@ def save_plans_to_csv(all_data: dict, csv_filename: str):
     For carriers other than Chatr and Koodo, plan_features will be formatted as bullet points.
     """
 
-    def parse_plan_data(data_str: str) -> float:
-        """
-        Convert data string into a numeric GB value.
-        - "xGB" returns float(x)
-        - "xMB" returns float(x) / 1024
-        - If no usable number is found, return 0.0
-        """
-        if not data_str or data_str.strip() == "":
-            return 0.0  # no data available
-        data_lower = data_str.lower().strip()
-        match = re.search(r'([\d\.]+)\s*(gb|mb)', data_lower)
-        if match:
-            numeric_value = float(match.group(1))
-            unit = match.group(2)
-            if unit == "gb":
-                return numeric_value
-            elif unit == "mb":
-                return numeric_value / 1024.0
-        return 0.0
-
-    rows = []
     # Define carriers with prepaid plans
     prepaid_carriers = ["chatr", "public_mobile", "freedom_prepaid"]
-
-    for carrier, plans_list in all_data.items():
-        # Determine the plan type based on the carrier
-        plan_type = "prepaid" if carrier in prepaid_carriers else "postpaid"
-        for plan in plans_list:
-            plan_name = (plan.get("plan_name", "") or "").strip()
-            plan_price = str(plan.get("plan_price", "")).strip()
-            plan_data_str = str(plan.get("plan_data", "") or "").strip()
-            numeric_data = parse_plan_data(plan_data_str)
-
-            # Process plan_features based on the carrier
-            raw_features = plan.get("plan_features", "")
-            if carrier not in ["chatr", "koodo"]:
-                # If features is a list, join them as bullet points
-                if isinstance(raw_features, list):
-                    formatted_features = "\n".join(f"• {feature}" for feature in raw_features)
-                # If it's a string, split it on common delimiters and join as bullet points
-                elif isinstance(raw_features, str):
-                    features_list = re.split(r"[,;]", raw_features)
-                    features_list = [feat.strip() for feat in features_list if feat.strip()]
-                    formatted_features = "\n".join(f"• {feat}" for feat in features_list)
-                else:
-                    formatted_features = ""
-            else:
-                # For Chatr and Koodo, keep the features as they are (or join if it's a list)
-                if isinstance(raw_features, list):
-                    formatted_features = ", ".join(raw_features)
-                else:
-                    formatted_features = raw_features
-
-            row = {
-                "carrier": carrier,
-                "plan_type": plan_type,
-                "plan_name": plan_name,
-                "plan_price": plan_price,
-                "plan_data": numeric_data,
-                "plan_features": formatted_features
-            }
-            rows.append(row)
-
     fieldnames = ["carrier", "plan_type", "plan_name", "plan_price", "plan_data", "plan_features"]
-    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    # (carrier, plan_name, plan_price, GB) of rows already written; tabbed pages often repeat plans
+    seen_plans = set()
+
+    # Rows are written as they are built rather than collected into a list first. They go to a
+    # temp file next to csv_filename that replaces it only once complete, so a failure part-way
+    # through leaves the previous CSV intact instead of a truncated one.
+    tmp_filename = csv_filename + ".tmp"
+    try:
+        with open(tmp_filename, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+
+            for carrier, plans_list in all_data.items():
+                # Determine the plan type based on the carrier
+                plan_type = "prepaid" if carrier in prepaid_carriers else "postpaid"
+                for plan in plans_list:
+                    plan_name = (plan.get("plan_name", "") or "").strip()
+                    plan_price = str(plan.get("plan_price", "")).strip()
+                    plan_data_str = str(plan.get("plan_data", "") or "").strip()
+                    numeric_data = parse_plan_data(plan_data_str)
+
+                    plan_key = (carrier, plan_name, plan_price, numeric_data)
+                    if plan_key in seen_plans:
+                        continue
+                    seen_plans.add(plan_key)
+
+                    # Process plan_features based on the carrier
+                    raw_features = plan.get("plan_features", "")
+                    if carrier not in ["chatr", "koodo"]:
+                        # If features is a list, join them as bullet points
+                        if isinstance(raw_features, list):
+                            formatted_features = "\n".join(f"• {feature}" for feature in raw_features)
+                        # If it's a string, split it on common delimiters and join as bullet points
+                        elif isinstance(raw_features, str):
+                            features_list = FEATURE_SPLIT_RE.split(raw_features)
+                            features_list = [feat.strip() for feat in features_list if feat.strip()]
+                            formatted_features = "\n".join(f"• {feat}" for feat in features_list)
+                        else:
+                            formatted_features = ""
+                    else:
+                        # For Chatr and Koodo, keep the features as they are (or join if it's a list)
+                        if isinstance(raw_features, list):
+                            formatted_features = ", ".join(raw_features)
+                        else:
+                            formatted_features = raw_features
+
+                    writer.writerow({
+                        "carrier": carrier,
+                        "plan_type": plan_type,
+                        "plan_name": plan_name,
+                        "plan_price": plan_price,
+                        "plan_data": numeric_data,
+                        "plan_features": formatted_features
+                    })
+
+        os.replace(tmp_filename, csv_filename)
+    except BaseException:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
 
 
 if __name__ == "__main__":